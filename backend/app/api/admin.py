@@ -3,22 +3,39 @@ from uuid import UUID
 from typing import Dict
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, func, delete, insert, update, values, column, Integer, String, Uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.config import settings
 from app.database import get_db
 from app.models.person import Person
 from app.models.photo import PhotoGallery
 from app.models.user import User
 from app.models.site_settings import SiteSettings
+from app.models.job import Job
+from app.models.dictionary import Category, Era
 from app.schemas import (
     PersonCreate, PersonUpdate, PersonResponse,
-    PersonListResponse, PhotoGalleryCreate, StatsResponse,
+    PersonListResponse, PhotoGalleryCreate, GalleryUpdate, StatsResponse, QueryStatsResponse,
+    PersonBulkRequest, PersonBulkResponse, JobCreate, JobResponse, JobListResponse,
 )
 from app.schemas.stats import EraCount
+from app.services.admission import admission
 from app.services.auth import get_current_user
+from app.services.cache import response_cache, single_flight
+from app.services.columnar import columnar_store
+from app.services.change_feed import publish_change, change_feed_status
+from app.services.dedup import find_duplicates
+from app.services.geocoder import geocode_person, get_gazetteer, resolve
+from app.services.images import image_cache
+from app.services.jobs import enqueue, job_runner, request_cancel
+from app.services.nearby import birthplace_index
+from app.services.query_log import query_stats
+from app.services.serialization import dumps
+from app.services.snapshot import snapshot_status
 
 
 class WelcomeSettingsUpdate(BaseModel):
@@ -32,6 +49,9 @@ class WelcomeSettingsUpdate(BaseModel):
 
 router = APIRouter()
 
+# Person columns the database rewrites on write (init-db/09 and 12); reloaded after a flush.
+TRIGGER_SET_FIELDS = ["era", "era_code", "era_auto", "category", "category_code", "updated_at"]
+
 
 @router.get("/persons", response_model=PersonListResponse)
 async def list_persons(
@@ -39,21 +59,23 @@ async def list_persons(
     per_page: int = Query(20, ge=1, le=100),
     search: str = Query("", max_length=255),
     era: str = Query(""),
+    era_code: int | None = Query(None),
+    category_code: int | None = Query(None),
     db: AsyncSession = Depends(get_db),
     _user: User = Depends(get_current_user),
 ):
-    query = select(Person).options(selectinload(Person.photos))
-
+    conditions = []
     if search:
-        query = query.where(Person.name.ilike(f"%{search}%"))
+        conditions.append(Person.name.ilike(f"%{search}%"))
     if era:
-        query = query.where(Person.era == era)
+        conditions.append(Person.era == era)
+    if era_code is not None:
+        conditions.append(Person.era_code == era_code)
+    if category_code is not None:
+        conditions.append(Person.category_code == category_code)
 
-    count_query = select(func.count(Person.id))
-    if search:
-        count_query = count_query.where(Person.name.ilike(f"%{search}%"))
-    if era:
-        count_query = count_query.where(Person.era == era)
+    query = select(Person).options(selectinload(Person.photos)).where(*conditions)
+    count_query = select(func.count(Person.id)).where(*conditions)
 
     total = (await db.execute(count_query)).scalar() or 0
     pages = math.ceil(total / per_page) if total else 1
@@ -75,12 +97,110 @@ async def create_person(
     _user: User = Depends(get_current_user),
 ):
     person = Person(**data.model_dump())
+    await geocode_person(person)
     db.add(person)
     await db.flush()
-    await db.refresh(person, attribute_names=["photos"])
+    await publish_change(db, "persons", person.id, "create")
+    await db.refresh(person, attribute_names=[*TRIGGER_SET_FIELDS, "photos"])
     return person
 
 
+# operation -> (column, value); a null value means "take it from the request".
+BULK_UPDATES = {
+    "publish": (Person.is_published, True),
+    "unpublish": (Person.is_published, False),
+    "set_era": (Person.era_code, None),
+    "set_category": (Person.category_code, None),
+}
+
+
+async def _bulk_dictionary_code(db: AsyncSession, operation: str, value: str | None):
+    """The code set_era/set_category writes for a requested era name or category slug.
+
+    Codes are written instead of names so the sync trigger never rewrites the value:
+    an unknown name would otherwise be replaced by a lifespan classification (era) or
+    added to the dictionary (category).
+    """
+    if value is None:
+        return None
+    if operation == "set_era":
+        code = (await db.execute(select(Era.code).where(Era.name == value))).scalar()
+    else:
+        code = (await db.execute(select(Category.code).where(Category.slug == value))).scalar()
+    if code is None:
+        raise HTTPException(status_code=422, detail=f"Unknown {operation.removeprefix('set_')}: {value}")
+    return code
+
+
+@router.post("/persons/bulk", response_model=PersonBulkResponse)
+async def bulk_persons(
+    data: PersonBulkRequest,
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Apply one operation to persons selected by ids or a filter as a single statement."""
+    if data.ids is not None:
+        if len(data.ids) > settings.PERSON_BULK_MAX_IDS:
+            raise HTTPException(status_code=422, detail=f"At most {settings.PERSON_BULK_MAX_IDS} ids per request")
+        conditions = [Person.id.in_(data.ids)]
+    else:
+        f = data.filter
+        conditions = []
+        if f.search:
+            conditions.append(Person.name.ilike(f"%{f.search}%"))
+        if f.era:
+            conditions.append(Person.era == f.era)
+        if f.category:
+            conditions.append(Person.category == f.category)
+        if f.era_code is not None:
+            conditions.append(Person.era_code == f.era_code)
+        if f.category_code is not None:
+            conditions.append(Person.category_code == f.category_code)
+        if f.year_from is not None:
+            conditions.append(Person.death_year >= f.year_from)
+        if f.year_to is not None:
+            conditions.append(Person.birth_year <= f.year_to)
+        if f.is_published is not None:
+            conditions.append(Person.is_published == f.is_published)
+        if not conditions:
+            # Never let a filter that selects nothing specific turn into a whole-table operation.
+            raise HTTPException(status_code=422, detail="filter needs at least one condition")
+
+    matched = (await db.execute(select(func.count(Person.id)).where(*conditions))).scalar() or 0
+
+    if data.operation == "delete":
+        # photo_gallery rows go with ON DELETE CASCADE; the deletion trigger leaves tombstones.
+        statement = delete(Person).where(*conditions)
+        affected_query = None
+    else:
+        column, value = BULK_UPDATES[data.operation]
+        if value is None:
+            value = await _bulk_dictionary_code(db, data.operation, data.value)
+        # Rows that already have the value are skipped, so updated_at and the change feed only see real changes.
+        changed = column.is_distinct_from(value)
+        new_values = {column: value}
+        if data.operation == "set_era":
+            if value is None:
+                # The trigger classifies a null era by lifespan and marks it automatic.
+                classified = func.classify_era(Person.birth_year, Person.death_year)
+                changed = ~Person.era_auto | Person.era_code.is_distinct_from(classified)
+            else:
+                new_values[Person.era_auto] = False
+                changed = changed | Person.era_auto
+        statement = update(Person).where(*conditions, changed).values(new_values)
+        affected_query = select(func.count(Person.id)).where(*conditions, changed)
+
+    if data.dry_run:
+        affected = matched if affected_query is None else (await db.execute(affected_query)).scalar() or 0
+    else:
+        result = await db.execute(statement.execution_options(synchronize_session=False))
+        affected = result.rowcount
+        if affected:
+            await publish_change(db, "persons", None, "delete" if data.operation == "delete" else "update")
+
+    return PersonBulkResponse(operation=data.operation, matched=matched, affected=affected, dry_run=data.dry_run)
+
+
 @router.get("/persons/{person_id}", response_model=PersonResponse)
 async def get_person(
     person_id: UUID,
@@ -113,9 +233,15 @@ async def update_person(
     update_data = data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(person, key, value)
+    if update_data.get("era_code") is not None or update_data.get("era") is not None:
+        # Chosen by the editor, even if it is the era the lifespan gives; the trigger
+        # reclassifies only automatic eras when the years change (init-db/13).
+        person.era_auto = False
+    await geocode_person(person)
 
     await db.flush()
-    await db.refresh(person, attribute_names=["photos"])
+    await publish_change(db, "persons", person.id)
+    await db.refresh(person, attribute_names=[*TRIGGER_SET_FIELDS, "photos"])
     return person
 
 
@@ -130,6 +256,7 @@ async def delete_person(
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
     await db.delete(person)
+    await publish_change(db, "persons", person_id, "delete")
 
 
 @router.post("/persons/{person_id}/photos", response_model=PersonResponse)
@@ -149,10 +276,65 @@ async def add_photo(
     photo = PhotoGallery(person_id=person_id, **data.model_dump())
     db.add(photo)
     await db.flush()
+    await publish_change(db, "persons", person_id)
     await db.refresh(person, attribute_names=["photos"])
     return person
 
 
+@router.put("/persons/{person_id}/photos", response_model=PersonResponse)
+async def replace_photos(
+    person_id: UUID,
+    data: GalleryUpdate,
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Make the gallery exactly `data.photos`: one DELETE, one UPDATE ... FROM (VALUES ...), one INSERT."""
+    if not (await db.execute(select(Person.id).where(Person.id == person_id))).scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Person not found")
+
+    existing = set((await db.execute(
+        select(PhotoGallery.id).where(PhotoGallery.person_id == person_id)
+    )).scalars().all())
+    kept = [(order, item) for order, item in enumerate(data.photos) if item.id is not None]
+    kept_ids = [item.id for _, item in kept]
+    unknown = set(kept_ids) - existing
+    if unknown or len(set(kept_ids)) != len(kept_ids):
+        raise HTTPException(status_code=422, detail="Photo ids must be unique photos of this person")
+
+    if existing - set(kept_ids):
+        await db.execute(
+            delete(PhotoGallery)
+            .where(PhotoGallery.person_id == person_id, PhotoGallery.id.notin_(kept_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if kept:
+        rows = values(
+            column("id", Uuid), column("display_order", Integer), column("caption", String),
+            name="new_order",
+        ).data([(item.id, order, item.caption) for order, item in kept])
+        await db.execute(
+            update(PhotoGallery)
+            .where(PhotoGallery.id == rows.c.id)
+            .values(display_order=rows.c.display_order, caption=rows.c.caption)
+            .execution_options(synchronize_session=False)
+        )
+    new = [
+        {"person_id": person_id, "photo_url": item.photo_url, "caption": item.caption, "display_order": order}
+        for order, item in enumerate(data.photos) if item.id is None
+    ]
+    if new:
+        await db.execute(insert(PhotoGallery).values(new))
+
+    await publish_change(db, "persons", person_id)
+    result = await db.execute(
+        select(Person)
+        .options(selectinload(Person.photos))
+        .where(Person.id == person_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
 @router.delete("/persons/{person_id}/photos/{photo_id}", status_code=204)
 async def delete_photo(
     person_id: UUID,
@@ -167,6 +349,7 @@ async def delete_photo(
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
     await db.delete(photo)
+    await publish_change(db, "persons", person_id)
 
 
 @router.get("/stats", response_model=StatsResponse)
@@ -179,26 +362,196 @@ async def get_stats(
         select(func.count(Person.id)).where(Person.is_published == True)
     )).scalar() or 0
 
+    era_counts = (
+        select(Person.era_code, func.count(Person.id).label("count"))
+        .where(Person.era_code.isnot(None))
+        .group_by(Person.era_code)
+        .subquery()
+    )
     era_rows = (await db.execute(
-        select(Person.era, func.count(Person.id))
-        .where(Person.era.isnot(None))
-        .group_by(Person.era)
+        select(Era.name, era_counts.c.count, Era.code, Era.color)
+        .join(era_counts, era_counts.c.era_code == Era.code)
+        .order_by(Era.start_year, Era.code)
     )).all()
 
+    cat_counts = (
+        select(Person.category_code, func.count(Person.id).label("count"))
+        .where(Person.category_code.isnot(None))
+        .group_by(Person.category_code)
+        .subquery()
+    )
     cat_rows = (await db.execute(
-        select(Person.category, func.count(Person.id))
-        .where(Person.category.isnot(None))
-        .group_by(Person.category)
+        select(Category.slug, cat_counts.c.count, Category.code, Category.label)
+        .join(cat_counts, cat_counts.c.category_code == Category.code)
+        .order_by(Category.code)
     )).all()
 
     return StatsResponse(
         total_persons=total,
         total_published=published,
-        by_era=[EraCount(era=row[0], count=row[1]) for row in era_rows],
-        by_category=[EraCount(era=row[0], count=row[1]) for row in cat_rows],
+        by_era=[EraCount(era=name, count=count, code=code, color=color) for name, count, code, color in era_rows],
+        by_category=[
+            EraCount(era=slug, count=count, code=code, label=label) for slug, count, code, label in cat_rows
+        ],
+    )
+
+
+@router.get("/query-stats", response_model=QueryStatsResponse)
+async def get_query_stats(
+    limit: int = Query(settings.SLOW_QUERY_TOP_N, ge=1, le=500),
+    _user: User = Depends(get_current_user),
+):
+    """Top statements of this worker by total execution time (requires SLOW_QUERY_LOG)."""
+    return QueryStatsResponse(
+        enabled=settings.SLOW_QUERY_LOG,
+        threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        items=query_stats.top(limit),
+    )
+
+
+@router.delete("/query-stats", status_code=204)
+async def reset_query_stats(_user: User = Depends(get_current_user)):
+    query_stats.reset()
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(_user: User = Depends(get_current_user)):
+    """Local response cache, request coalescing, image cache, nearby index, columnar dataset and change-feed state of this worker."""
+    return {
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "image_cache": image_cache.stats(),
+        "nearby_index": birthplace_index.stats(),
+        "columnar_dataset": columnar_store.stats(),
+        "change_feed": change_feed_status(),
+    }
+
+
+@router.get("/admission-stats")
+async def get_admission_stats(_user: User = Depends(get_current_user)):
+    """Admitted and rejected public requests and connection-pool waits of this worker."""
+    return admission.stats()
+
+
+@router.get("/snapshot")
+async def get_snapshot_status(_user: User = Depends(get_current_user)):
+    """Current static snapshot version and the last export of this worker."""
+    return snapshot_status()
+
+
+@router.post("/snapshot", response_model=JobResponse, status_code=202)
+async def create_snapshot(
+    force: bool = Query(False, description="Export even if the snapshot matches the dataset version"),
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Queue a snapshot export; poll /api/admin/jobs/{id} for the result."""
+    return await enqueue(db, "snapshot_export", {"force": force}, unique=True)
+
+
+@router.get("/dedup")
+async def get_duplicate_candidates(
+    min_score: float | None = Query(None, ge=0, le=1, description="Defaults to DEDUP_MIN_SCORE"),
+    _user: User = Depends(get_current_user),
+):
+    """Likely duplicate persons as NDJSON, streamed bucket by bucket while the analysis runs."""
+    async def lines():
+        async for pair in find_duplicates(min_score):
+            yield dumps(pair) + b"\n"
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/geocode")
+async def geocode_place(
+    place: str = Query(..., min_length=1, max_length=255),
+    _user: User = Depends(get_current_user),
+):
+    """Look a place name up in the local gazetteer, for the person form."""
+    if await get_gazetteer() is None:
+        raise HTTPException(status_code=503, detail="Gazetteer is not installed")
+    found = resolve(place)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Place not found")
+    return found
+
+
+@router.post("/geocode/backfill", response_model=JobResponse, status_code=202)
+async def geocode_backfill(
+    dry_run: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Queue filling missing coordinates of all persons from their place names."""
+    if not settings.GAZETTEER_PATH.is_file():
+        raise HTTPException(status_code=503, detail="Gazetteer is not installed")
+    return await enqueue(db, "geocode_backfill", {"dry_run": dry_run}, unique=True)
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: str | None = Query(None, description="queued, running, succeeded, failed or cancelled"),
+    kind: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Most recent background jobs first, with counts per status."""
+    query = select(Job).order_by(Job.created_at.desc(), Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    if kind:
+        query = query.where(Job.kind == kind)
+    items = (await db.execute(query)).scalars().all()
+    counts = dict((await db.execute(select(Job.status, func.count()).group_by(Job.status))).all())
+    return JobListResponse(items=items, counts=counts)
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    data: JobCreate,
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    try:
+        return await enqueue(db, data.kind, data.payload, max_attempts=data.max_attempts)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/jobs/worker")
+async def get_job_worker(_user: User = Depends(get_current_user)):
+    """Job kinds and counters of the worker in the process that serves the request."""
+    return job_runner.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Cancel a queued job, or ask a running one to stop."""
+    job = await request_cancel(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.get("/settings/welcome", response_model=Dict[str, str])
 async def admin_get_welcome(
     db: AsyncSession = Depends(get_db),
@@ -227,6 +580,8 @@ async def admin_update_welcome(
             row.value = value
         else:
             db.add(SiteSettings(key=key, value=value))
+    if updates:
+        await publish_change(db, "settings")
 
     result = await db.execute(
         select(SiteSettings).where(SiteSettings.key.like("welcome_%"))
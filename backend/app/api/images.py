@@ -0,0 +1,39 @@
+from pathlib import PurePosixPath
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.config import settings
+from app.services.images import MEDIA_TYPE, ImageError, image_cache
+
+router = APIRouter()
+
+
+@router.get("/img/{width:int}x{height:int}/{path:path}")
+async def get_resized_image(
+    width: int,
+    height: int,
+    path: str,
+    fit: Literal["cover", "contain"] = Query("cover", description="cover crops to the exact size, contain fits inside it"),
+):
+    """Serve an upload (path relative to /uploads/) resized to at most width x height, as WebP."""
+    # Only the sizes the UI asks for: any other W x H would be a fresh render and a new cache entry.
+    if (width, height) not in settings.IMAGE_PRERENDER_SIZES:
+        allowed = ", ".join(f"{w}x{h}" for w, h in settings.IMAGE_PRERENDER_SIZES)
+        raise HTTPException(status_code=422, detail=f"Size must be one of: {allowed}")
+    try:
+        variant = await image_cache.get(path, width, height, fit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    except ImageError as e:
+        print(f"[IMAGES] {e}")
+        raise HTTPException(status_code=422, detail="Image cannot be processed")
+
+    # Admin uploads get a fresh name on every upload, so their variant URLs never change content.
+    # Seed photos keep their name when scripts/fetch_wiki_photos.py re-downloads them: revalidate daily.
+    if PurePosixPath(path).parts[:1] == ("seed",):
+        cache_control = "public, max-age=86400"
+    else:
+        cache_control = "public, max-age=31536000, immutable"
+    return FileResponse(variant, media_type=MEDIA_TYPE, headers={"Cache-Control": cache_control})
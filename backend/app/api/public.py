@@ -1,84 +1,309 @@
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
-from typing import Dict
+from typing import Dict, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select, func, String
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, async_session
+from app.config import settings
 from app.models.person import Person
+from app.models.person_deletion import PersonDeletion
 from app.models.site_settings import SiteSettings
-from app.schemas import PersonResponse, PersonMapResponse, PersonYearRangeResponse, EraResponse
+from app.schemas import (
+    PersonResponse, PersonMapResponse, PersonYearRangeResponse, PersonChangesResponse, EraResponse,
+    DictionariesResponse, PersonBatchRequest, PersonBatchResponse, PersonNearbyResponse,
+)
+from app.services.cache import cached_body, cached_json, response_cache
+from app.services.columnar import columnar_store
+from app.services.dictionaries import load_dictionaries, load_eras
+from app.services.nearby import birthplace_index
+from app.services.playback import LifespanIndex
+from app.services.serialization import (
+    MAP_FIELDS, YEAR_RANGE_FIELDS, FastJSONResponse, dumps, person_columns, person_detail_dict, rows_to_dicts,
+)
+from app.services.readiness import register_warmup
 
 router = APIRouter()
 
-ERAS = [
-    EraResponse(name="Древний Египет", start_year=-3000, end_year=-30, color="#8B4513"),
-    EraResponse(name="Античность", start_year=-800, end_year=476, color="#CD853F"),
-    EraResponse(name="Средневековье", start_year=476, end_year=1500, color="#4A5568"),
-    EraResponse(name="Возрождение", start_year=1300, end_year=1600, color="#2D8659"),
-    EraResponse(name="Новое время", start_year=1500, end_year=1900, color="#2B6CB0"),
-    EraResponse(name="Новейшее время", start_year=1900, end_year=2026, color="#E53E3E"),
-]
+# Year the frontend timeline opens on (HomePage initial state).
+DEFAULT_YEAR = 1800
 
 
 @router.get("/persons", response_model=list[PersonMapResponse])
 async def get_persons_by_year(
     year: int = Query(..., ge=-10000, le=2100, description="Year to filter persons"),
     db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
 ):
     """Return all published persons alive in the given year (lightweight for map markers)."""
-    result = await db.execute(
-        select(Person)
-        .where(
-            Person.is_published == True,
-            Person.birth_year <= year,
-            Person.death_year >= year,
-            Person.birth_lat.isnot(None),
-            Person.birth_lon.isnot(None),
+    async def load() -> bytes:
+        dataset = columnar_store.current()
+        if dataset is not None:
+            return dataset.persons_alive(year)
+        result = await db.execute(
+            select(*person_columns(MAP_FIELDS))
+            .where(
+                Person.is_published == True,
+                Person.birth_year <= year,
+                Person.death_year >= year,
+                Person.birth_lat.isnot(None),
+                Person.birth_lon.isnot(None),
+            )
+            .order_by(Person.name)
         )
-        .order_by(Person.name)
+        return dumps(rows_to_dicts(result.all(), MAP_FIELDS))
+
+    return await cached_body(f"persons:year:{year}", "persons", load, accept_encoding)
+
+
+@router.get("/persons/changes", response_model=PersonChangesResponse)
+async def get_person_changes(
+    since: Optional[datetime] = Query(None, description="Cursor from a previous response; omit for a full snapshot"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return map records changed since `since` and ids of persons deleted or unpublished.
+
+    The returned cursor lags the database clock by DELTA_SYNC_OVERLAP_SECONDS so
+    transactions that were still committing are picked up by the next call;
+    clients apply upserts idempotently, so the repeated tail is harmless.
+    """
+    now = (await db.execute(select(func.timezone("UTC", func.clock_timestamp())))).scalar_one()
+    cursor = now - timedelta(seconds=settings.DELTA_SYNC_OVERLAP_SECONDS)
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    query = select(*person_columns(MAP_FIELDS), Person.is_published)
+    if since is None:
+        query = query.where(Person.is_published == True)
+    else:
+        query = query.where(Person.updated_at >= since).limit(settings.DELTA_SYNC_MAX_CHANGES + 1)
+    rows = (await db.execute(query.order_by(Person.updated_at))).all()
+
+    if since is not None and len(rows) > settings.DELTA_SYNC_MAX_CHANGES:
+        # Cheaper for the client to reload everything than to replay this delta.
+        return FastJSONResponse({"cursor": cursor, "full_resync": True, "upserts": [], "deleted": []})
+
+    deleted = [row[0] for row in rows if not row[-1]]
+    if since is not None:
+        deleted += (await db.execute(
+            select(PersonDeletion.person_id.cast(String)).where(PersonDeletion.deleted_at >= since)
+        )).scalars().all()
+
+    return FastJSONResponse({
+        "cursor": cursor,
+        "full_resync": False,
+        "upserts": rows_to_dicts((row for row in rows if row[-1]), MAP_FIELDS),
+        "deleted": deleted,
+    })
+
+
+async def _person_batch(ids: list[UUID], db: AsyncSession) -> Response:
+    """Assemble detail records from the per-person cache, loading misses in two queries."""
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.PERSON_BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.PERSON_BATCH_MAX_IDS} ids per request")
+
+    bodies: dict[UUID, bytes] = {}
+    for person_id in ids:
+        entry = response_cache.get(f"persons:detail:{person_id}")
+        if entry is not None:
+            bodies[person_id] = entry.body
+
+    to_load = [person_id for person_id in ids if person_id not in bodies]
+    if to_load:
+        generation = response_cache.generation
+        result = await db.execute(
+            select(Person)
+            .options(selectinload(Person.photos))
+            .where(Person.id.in_(to_load), Person.is_published == True)
+        )
+        for person in result.scalars().all():
+            body = dumps(person_detail_dict(person))
+            response_cache.set(f"persons:detail:{person.id}", body, "persons", generation)
+            bodies[person.id] = body
+
+    # Cached detail bodies are spliced in as-is rather than decoded and re-encoded.
+    items = b",".join(bodies[person_id] for person_id in ids if person_id in bodies)
+    missing = [person_id for person_id in ids if person_id not in bodies]
+    return Response(
+        b'{"items":[' + items + b'],"missing":' + dumps(missing) + b"}",
+        media_type="application/json",
     )
-    return result.scalars().all()
+
+
+def _parse_ids(ids: str) -> list[UUID]:
+    try:
+        return [UUID(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated UUIDs")
+
+
+@router.get("/persons/batch", response_model=PersonBatchResponse)
+async def get_persons_batch(
+    ids: str = Query(..., description="Comma-separated person ids"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return details of several persons, in request order, with unknown ids in `missing`."""
+    return await _person_batch(_parse_ids(ids), db)
+
+
+@router.post("/persons/batch", response_model=PersonBatchResponse)
+async def post_persons_batch(data: PersonBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Same as GET /persons/batch, for id lists too long for a query string."""
+    return await _person_batch(data.ids, db)
+
+
+@router.get("/persons/nearby", response_model=list[PersonNearbyResponse])
+async def get_persons_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(100, gt=0, le=settings.NEARBY_MAX_RADIUS_KM, description="Search radius, km"),
+    year_from: Optional[int] = Query(None, ge=-10000, le=2100, description="Only persons alive at or after this year"),
+    year_to: Optional[int] = Query(None, ge=-10000, le=2100, description="Only persons alive at or before this year"),
+    limit: int = Query(100, ge=1, le=settings.NEARBY_MAX_RESULTS),
+):
+    """Return published persons born within `radius` km of a point, nearest first."""
+    await birthplace_index.ensure_loaded()
+    return FastJSONResponse(birthplace_index.query(lat, lon, radius, year_from, year_to, limit))
 
 
 @router.get("/persons/{person_id}", response_model=PersonResponse)
-async def get_person_detail(person_id: UUID, db: AsyncSession = Depends(get_db)):
+async def get_person_detail(
+    person_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
+):
     """Return full person details including photo gallery."""
-    result = await db.execute(
-        select(Person)
-        .options(selectinload(Person.photos))
-        .where(Person.id == person_id, Person.is_published == True)
-    )
-    person = result.scalar_one_or_none()
-    if not person:
-        raise HTTPException(status_code=404, detail="Person not found")
-    return person
+    async def load():
+        result = await db.execute(
+            select(Person)
+            .options(selectinload(Person.photos))
+            .where(Person.id == person_id, Person.is_published == True)
+        )
+        person = result.scalar_one_or_none()
+        if not person:
+            raise HTTPException(status_code=404, detail="Person not found")
+        return person_detail_dict(person)
+
+    return await cached_json(f"persons:detail:{person_id}", "persons", load, accept_encoding)
 
 
 @router.get("/timeline/eras", response_model=list[EraResponse])
-async def get_eras():
-    """Return list of historical eras for timeline markers."""
-    return ERAS
+async def get_eras(
+    db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """Return list of historical eras for timeline markers, with published person counts."""
+    async def load():
+        return await load_eras(db)
+
+    return await cached_json("timeline:eras", "persons", load, accept_encoding)
+
+
+@router.get("/dictionaries", response_model=DictionariesResponse)
+async def get_dictionaries(
+    db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """Return the eras and categories that era_code / category_code in person records refer to."""
+    async def load():
+        return await load_dictionaries(db)
+
+    return await cached_json("dictionaries", "persons", load, accept_encoding)
 
 
 @router.get("/timeline/person-markers", response_model=list[PersonYearRangeResponse])
-async def get_person_markers(db: AsyncSession = Depends(get_db)):
+async def get_person_markers(
+    db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
+):
     """Return birth/death year ranges for all published persons (for timeline heat indicators)."""
+    async def load() -> bytes:
+        dataset = columnar_store.current()
+        if dataset is not None:
+            return dataset.markers()
+        result = await db.execute(
+            select(*person_columns(YEAR_RANGE_FIELDS))
+            .where(Person.is_published == True)
+            .order_by(Person.birth_year)
+        )
+        return dumps(rows_to_dicts(result.all(), YEAR_RANGE_FIELDS))
+
+    return await cached_body("persons:markers", "persons", load, accept_encoding)
+
+
+@router.get("/timeline/playback")
+async def get_timeline_playback(
+    start: int = Query(..., ge=-10000, le=2100, description="First year of playback"),
+    step: int = Query(1, ge=-1000, le=1000, description="Years per step, negative to play backwards"),
+    count: int = Query(100, ge=1, le=settings.PLAYBACK_MAX_STEPS, description="Number of steps"),
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the alive set at `start`, then only arrivals and departures for each step.
+
+    Frames: {"type": "init", "year", "persons": [...]} followed by
+    {"type": "step", "year", "added": [...], "removed": [ids]}; records have the
+    same shape as /api/persons?year=.
+    """
+    if step == 0:
+        raise HTTPException(status_code=400, detail="step must not be 0")
+    lo, hi = sorted((start, start + step * count))
+
     result = await db.execute(
-        select(Person)
-        .where(Person.is_published == True)
-        .order_by(Person.birth_year)
+        select(*person_columns(MAP_FIELDS))
+        .where(
+            Person.is_published == True,
+            Person.birth_year <= hi,
+            Person.death_year >= lo,
+            Person.birth_lat.isnot(None),
+            Person.birth_lon.isnot(None),
+        )
+        .order_by(Person.name)
+    )
+    index = LifespanIndex(rows_to_dicts(result.all(), MAP_FIELDS))
+
+    def encode():
+        for frame in index.frames(start, step, count):
+            if format == "sse":
+                yield b"event: " + frame["type"].encode() + b"\ndata: " + dumps(frame) + b"\n\n"
+            else:
+                yield dumps(frame) + b"\n"
+
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        # Let nginx pass frames through as they are produced.
+        headers={"X-Accel-Buffering": "no"},
     )
-    return result.scalars().all()
 
 
 @router.get("/settings/welcome", response_model=Dict[str, str])
-async def get_welcome_settings(db: AsyncSession = Depends(get_db)):
+async def get_welcome_settings(
+    db: AsyncSession = Depends(get_db),
+    accept_encoding: Optional[str] = Header(None),
+):
     """Return welcome popup settings."""
-    result = await db.execute(
-        select(SiteSettings).where(SiteSettings.key.like("welcome_%"))
-    )
-    rows = result.scalars().all()
-    return {row.key: row.value for row in rows}
+    async def load():
+        result = await db.execute(
+            select(SiteSettings.key, SiteSettings.value).where(SiteSettings.key.like("welcome_%"))
+        )
+        return dict(result.all())
+
+    return await cached_json("settings:welcome", "settings", load, accept_encoding)
+
+
+async def warm_public_queries():
+    """Run the landing-page queries once so plans, compiled SQL and Postgres buffers are hot."""
+    async with async_session() as session:
+        await get_person_markers(db=session, accept_encoding=None)
+        await get_persons_by_year(year=DEFAULT_YEAR, db=session, accept_encoding=None)
+        await get_welcome_settings(db=session, accept_encoding=None)
+        await get_dictionaries(db=session, accept_encoding=None)
+
+
+register_warmup("public_queries", warm_public_queries)
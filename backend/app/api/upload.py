@@ -1,12 +1,16 @@
+import asyncio
 import uuid
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.database import get_db
 from app.models.user import User
 from app.services.auth import get_current_user
+from app.services.jobs import enqueue
 
 router = APIRouter()
 
@@ -14,6 +18,7 @@ router = APIRouter()
 @router.post("/upload/image")
 async def upload_image(
     file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
     _user: User = Depends(get_current_user),
 ):
     if not file.content_type or not file.content_type.startswith("image/"):
@@ -30,10 +35,18 @@ async def upload_image(
     filename = f"{uuid.uuid4()}{ext}"
     filepath = settings.UPLOAD_DIR / filename
 
-    with open(filepath, "wb") as f:
-        f.write(content)
-
-    return JSONResponse({"url": f"/uploads/{filename}", "filename": filename})
+    # Thumbnails are rendered by a job worker, not while the admin waits for the upload.
+    # The job is queued first and committed only once the file is written, so a failure
+    # in either step leaves neither an orphan file nor a job without its file.
+    job = await enqueue(db, "image_variants", {"path": filename})
+    try:
+        await asyncio.to_thread(filepath.write_bytes, content)
+        await db.commit()
+    except Exception:
+        await asyncio.to_thread(filepath.unlink, missing_ok=True)
+        raise
+
+    return JSONResponse({"url": f"/uploads/{filename}", "filename": filename, "job_id": job.id})
 
 
 @router.delete("/upload/{filename}", status_code=204)
@@ -21,11 +21,107 @@ class Settings:
 
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     UPLOAD_DIR: Path = BASE_DIR / "uploads"
+    # nginx serves /uploads from the shared volume in production (docker-compose.yml
+    # sets this to false); the default is for running the backend without nginx.
+    SERVE_UPLOADS: bool = os.getenv("SERVE_UPLOADS", "true").lower() in ("1", "true", "yes")
 
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10 MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
+    SLOW_QUERY_LOG: bool = os.getenv("SLOW_QUERY_LOG", "false").lower() in ("1", "true", "yes")
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+    SLOW_QUERY_TOP_N: int = int(os.getenv("SLOW_QUERY_TOP_N", "50"))
+
+    WARMUP_POOL_CONNECTIONS: int = int(os.getenv("WARMUP_POOL_CONNECTIONS", "5"))
+
+    CHANGE_FEED_ENABLED: bool = os.getenv("CHANGE_FEED_ENABLED", "true").lower() in ("1", "true", "yes")
+    CHANGE_POLL_INTERVAL_SECONDS: float = float(os.getenv("CHANGE_POLL_INTERVAL_SECONDS", "5"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1000"))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "9"))
+    # Quality 11 takes seconds on multi-megabyte payloads; 9 is a few hundred ms.
+    RESPONSE_BROTLI_QUALITY: int = int(os.getenv("RESPONSE_BROTLI_QUALITY", "9"))
+    RESPONSE_ZSTD_LEVEL: int = int(os.getenv("RESPONSE_ZSTD_LEVEL", "10"))
+    # Longest a public response may be computed, or waited for by coalesced requests.
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "15"))
+
+    DELTA_SYNC_OVERLAP_SECONDS: int = int(os.getenv("DELTA_SYNC_OVERLAP_SECONDS", "30"))
+    DELTA_SYNC_MAX_CHANGES: int = int(os.getenv("DELTA_SYNC_MAX_CHANGES", "10000"))
+
+    IMAGE_CACHE_DIR: Path = Path(os.getenv("IMAGE_CACHE_DIR", str(BASE_DIR / "cache" / "img")))
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    IMAGE_MAX_SOURCE_PIXELS: int = int(os.getenv("IMAGE_MAX_SOURCE_PIXELS", str(100_000_000)))
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "80"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    # The only sizes /api/img serves, also rendered in the background after an upload:
+    # map markers and the admin list, at 1x and 2x.
+    IMAGE_PRERENDER_SIZES: list = [
+        tuple(int(n) for n in size.split("x"))
+        for size in os.getenv("IMAGE_PRERENDER_SIZES", "38x38,76x76,40x40,80x80").split(",") if size.strip()
+    ]
+
+    PERSON_BATCH_MAX_IDS: int = int(os.getenv("PERSON_BATCH_MAX_IDS", "100"))
+    PERSON_BULK_MAX_IDS: int = int(os.getenv("PERSON_BULK_MAX_IDS", "10000"))
+
+    PLAYBACK_MAX_STEPS: int = int(os.getenv("PLAYBACK_MAX_STEPS", "5000"))
+
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+    # Trust the client address nginx sets; disable when the backend is reachable directly.
+    ADMISSION_TRUST_X_REAL_IP: bool = os.getenv("ADMISSION_TRUST_X_REAL_IP", "true").lower() in ("1", "true", "yes")
+    ADMISSION_MAX_CLIENTS: int = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))
+    RATE_LIMIT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "60"))
+    ROUTE_MAX_IN_FLIGHT: int = int(os.getenv("ROUTE_MAX_IN_FLIGHT", "32"))
+    POOL_WAIT_SHED_MS: float = float(os.getenv("POOL_WAIT_SHED_MS", "250"))
+
+    NEARBY_CELL_DEGREES: float = float(os.getenv("NEARBY_CELL_DEGREES", "1.0"))
+    NEARBY_MAX_RADIUS_KM: float = float(os.getenv("NEARBY_MAX_RADIUS_KM", "2000"))
+    NEARBY_MAX_RESULTS: int = int(os.getenv("NEARBY_MAX_RESULTS", "500"))
+
+    DEDUP_MIN_SCORE: float = float(os.getenv("DEDUP_MIN_SCORE", "0.85"))
+    DEDUP_BUCKET_YEARS: int = int(os.getenv("DEDUP_BUCKET_YEARS", "25"))
+    DEDUP_YEAR_TOLERANCE: int = int(os.getenv("DEDUP_YEAR_TOLERANCE", "20"))
+    DEDUP_PROBE_TRIGRAMS: int = int(os.getenv("DEDUP_PROBE_TRIGRAMS", "6"))
+    DEDUP_MIN_SHARED_TRIGRAMS: int = int(os.getenv("DEDUP_MIN_SHARED_TRIGRAMS", "2"))
+    DEDUP_MAX_TRIGRAM_FREQUENCY: int = int(os.getenv("DEDUP_MAX_TRIGRAM_FREQUENCY", "500"))
+    DEDUP_WORKERS: int = int(os.getenv("DEDUP_WORKERS", str(os.cpu_count() or 2)))
+
+    GAZETTEER_PATH: Path = Path(os.getenv("GAZETTEER_PATH", str(BASE_DIR / "data" / "cities15000.txt")))
+    # GeoNames feature classes to index: populated places, admin areas, regions, islands and mountains.
+    GAZETTEER_FEATURE_CLASSES: str = os.getenv("GAZETTEER_FEATURE_CLASSES", "PALT")
+    GEOCODE_ON_SAVE: bool = os.getenv("GEOCODE_ON_SAVE", "true").lower() in ("1", "true", "yes")
+    GEOCODE_CACHE_SIZE: int = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+
+    # Jobs each backend process runs at once; 0 when a separate `python -m app.services.jobs` runs them.
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "2"))
+    JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "60"))
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "14"))
+
+    # Columnar dataset file mapped by every worker for /api/persons and the timeline markers.
+    COLUMNAR_DATASET: bool = os.getenv("COLUMNAR_DATASET", "true").lower() in ("1", "true", "yes")
+    COLUMNAR_DIR: Path = Path(os.getenv("COLUMNAR_DIR", str(BASE_DIR / "cache" / "dataset")))
+    COLUMNAR_KEEP_VERSIONS: int = int(os.getenv("COLUMNAR_KEEP_VERSIONS", "2"))
+
+    SNAPSHOT_DIR: Path = Path(os.getenv("SNAPSHOT_DIR", str(BASE_DIR / "snapshots")))
+    SNAPSHOT_BUCKET_YEARS: int = int(os.getenv("SNAPSHOT_BUCKET_YEARS", "100"))
+    SNAPSHOT_KEEP_VERSIONS: int = int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "3"))
+    # docker-compose.yml turns this on next to the nginx /snapshot/ location; off by default
+    # so a bare backend does not write snapshots nobody serves.
+    SNAPSHOT_AUTO_EXPORT: bool = os.getenv("SNAPSHOT_AUTO_EXPORT", "false").lower() in ("1", "true", "yes")
+    SNAPSHOT_AUTO_EXPORT_DELAY_SECONDS: float = float(os.getenv("SNAPSHOT_AUTO_EXPORT_DELAY_SECONDS", "10"))
+
+    def ensure_directories(self):
+        self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        (self.UPLOAD_DIR / "seed").mkdir(parents=True, exist_ok=True)
+        self.IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.COLUMNAR_DIR.mkdir(parents=True, exist_ok=True)
+
 
 settings = Settings()
-settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-(settings.UPLOAD_DIR / "seed").mkdir(parents=True, exist_ok=True)
@@ -2,8 +2,12 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
+from app.services.admission import MeasuredQueuePool
+from app.services.query_log import install_query_log
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+engine = create_async_engine(settings.DATABASE_URL, echo=False, poolclass=MeasuredQueuePool)
+if settings.SLOW_QUERY_LOG:
+    install_query_log(engine.sync_engine)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -1,7 +1,9 @@
+import asyncio
 import traceback
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import select, func, text
@@ -10,12 +12,26 @@ from app.config import settings
 from app.database import async_session
 from app.models.user import User
 from app.models.person import Person
-from app.services.auth import hash_password
+from app.models.site_settings import SiteSettings
+from app.services.auth import hash_password, verify_password
+from app.services.admission import AdmissionMiddleware
+from app.services.readiness import register_warmup, warm_up, is_ready, readiness_status
+from app.services.change_feed import start_change_feed
+from app.services.images import image_cache
+from app.services.jobs import start_job_workers
 from app.api import api_router
 
 
+# Written by earlier versions to skip bcrypt on restart; dropped because it allowed fast offline guessing.
+LEGACY_PASSWORD_CHECK_KEY = "admin_password_check"
+
+
 async def create_admin_user():
-    """Create or update admin user from environment variables."""
+    """Create the admin user from environment variables, or sync its password.
+
+    bcrypt runs once per start, in a thread so the event loop stays free, and
+    rehashes only when ADMIN_PASSWORD no longer matches the stored hash.
+    """
     try:
         async with async_session() as session:
             result = await session.execute(
@@ -24,34 +40,63 @@ async def create_admin_user():
             existing = result.scalar_one_or_none()
 
             if existing is None:
-                admin = User(
+                existing = User(
                     email=settings.ADMIN_EMAIL,
-                    password_hash=hash_password(settings.ADMIN_PASSWORD),
+                    password_hash=await asyncio.to_thread(hash_password, settings.ADMIN_PASSWORD),
                     role="admin",
                     is_active=True,
                 )
-                session.add(admin)
-                await session.commit()
+                session.add(existing)
                 print(f"[STARTUP] Admin user CREATED: {settings.ADMIN_EMAIL}")
-            else:
-                existing.password_hash = hash_password(settings.ADMIN_PASSWORD)
-                existing.is_active = True
-                await session.commit()
+            elif not await asyncio.to_thread(verify_password, settings.ADMIN_PASSWORD, existing.password_hash):
+                existing.password_hash = await asyncio.to_thread(hash_password, settings.ADMIN_PASSWORD)
                 print(f"[STARTUP] Admin user password UPDATED: {settings.ADMIN_EMAIL}")
 
-            user_count = (await session.execute(select(func.count(User.id)))).scalar()
-            person_count = (await session.execute(select(func.count(Person.id)))).scalar()
-            print(f"[STARTUP] Database: {user_count} users, {person_count} persons")
+            if not existing.is_active:
+                existing.is_active = True
+
+            legacy_check = await session.get(SiteSettings, LEGACY_PASSWORD_CHECK_KEY)
+            if legacy_check is not None:
+                await session.delete(legacy_check)
+
+            if session.dirty or session.new or session.deleted:
+                await session.commit()
 
     except Exception as e:
         print(f"[STARTUP ERROR] Failed to create admin user: {e}")
         traceback.print_exc()
 
 
+async def log_database_counts():
+    try:
+        async with async_session() as session:
+            user_count = (await session.execute(select(func.count(User.id)))).scalar()
+            person_count = (await session.execute(select(func.count(Person.id)))).scalar()
+        print(f"[STARTUP] Database: {user_count} users, {person_count} persons")
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to count rows: {e}")
+
+
+register_warmup("admin_user", create_admin_user)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_admin_user()
+    settings.ensure_directories()
+    # Startup work runs in the background so the process answers /api/health at
+    # once; /api/ready reports when warm-up has finished.
+    background = [
+        asyncio.create_task(warm_up()),
+        asyncio.create_task(log_database_counts()),
+        *start_change_feed(),
+        *start_job_workers(),
+    ]
     yield
+    for task in background:
+        task.cancel()
+    # Lets running jobs go back to the queue before the process exits.
+    await asyncio.gather(*background, return_exceptions=True)
+    image_cache.shutdown()
 
 
 app = FastAPI(
@@ -60,6 +105,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if settings.ADMISSION_CONTROL:
+    # Added before CORS so that CORS wraps it and rejections still carry CORS headers.
+    app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -68,7 +117,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/uploads", StaticFiles(directory=str(settings.UPLOAD_DIR)), name="uploads")
+if settings.SERVE_UPLOADS:
+    # check_dir=False: the directory is created in lifespan, not at import time.
+    app.mount("/uploads", StaticFiles(directory=str(settings.UPLOAD_DIR), check_dir=False), name="uploads")
 
 app.include_router(api_router, prefix="/api")
 
@@ -78,6 +129,12 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 503 until startup warm-up has finished."""
+    return JSONResponse(readiness_status(), status_code=200 if is_ready() else 503)
+
+
 @app.get("/api/debug")
 async def debug():
     """Diagnostic endpoint — shows DB state without sensitive data."""
@@ -3,5 +3,9 @@ from .person import Person
 from .photo import PhotoGallery
 from .event import Event
 from .site_settings import SiteSettings
+from .dataset_version import DatasetVersion
+from .person_deletion import PersonDeletion
+from .job import Job
+from .dictionary import Era, Category
 
-__all__ = ["User", "Person", "PhotoGallery", "Event", "SiteSettings"]
+__all__ = ["User", "Person", "PhotoGallery", "Event", "SiteSettings", "DatasetVersion", "PersonDeletion", "Job", "Era", "Category"]
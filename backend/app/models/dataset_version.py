@@ -0,0 +1,12 @@
+from sqlalchemy import Column, SmallInteger, BigInteger, DateTime, func
+
+from app.database import Base
+
+
+class DatasetVersion(Base):
+    """Single-row counter bumped by every admin write (see services/change_feed.py)."""
+    __tablename__ = "dataset_version"
+
+    id = Column(SmallInteger, primary_key=True, default=1)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
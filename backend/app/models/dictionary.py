@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, SmallInteger, String
+
+from app.database import Base
+
+
+class Era(Base):
+    """Timeline era; persons reference it by code (init-db/12)."""
+    __tablename__ = "eras"
+
+    code = Column(SmallInteger, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)
+    start_year = Column(Integer, nullable=False)
+    end_year = Column(Integer, nullable=False)
+    color = Column(String(20), nullable=False, default="#e94560")
+
+
+class Category(Base):
+    """Activity category; unknown slugs written to persons.category are added automatically."""
+    __tablename__ = "categories"
+
+    code = Column(SmallInteger, primary_key=True)
+    slug = Column(String(100), nullable=False, unique=True)
+    label = Column(String(100), nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, BigInteger, Boolean, DateTime, Float, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.database import Base
+
+
+class Job(Base):
+    """Background job, claimed by workers with FOR UPDATE SKIP LOCKED (see services/jobs.py)."""
+    __tablename__ = "jobs"
+
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    # queued -> running -> succeeded | failed | cancelled; failed attempts go back to queued.
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    progress = Column(Float, nullable=False, default=0)
+    message = Column(Text)
+    result = Column(JSONB)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(100))
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime
+from sqlalchemy import Column, String, Integer, SmallInteger, Float, Boolean, Text, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -32,8 +32,13 @@ class Person(Base):
     activity_description = Column(String(500))
     short_bio = Column(Text)
 
+    # Names kept in sync with the codes by a trigger (init-db/12); a person without an era gets one by lifespan.
     era = Column(String(100))
     category = Column(String(100))
+    era_code = Column(SmallInteger, ForeignKey("eras.code"))
+    category_code = Column(SmallInteger, ForeignKey("categories.code"))
+    # True while the era is the lifespan classification; reclassified when the years change (init-db/13).
+    era_auto = Column(Boolean, nullable=False, default=False)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class PersonDeletion(Base):
+    """Tombstone written by the persons AFTER DELETE trigger (init-db/09)."""
+    __tablename__ = "person_deletions"
+
+    person_id = Column(UUID(as_uuid=True), primary_key=True)
+    deleted_at = Column(DateTime, nullable=False)
@@ -1,15 +1,20 @@
 from .auth import LoginRequest, TokenResponse
 from .person import (
     PersonCreate, PersonUpdate, PersonResponse, PersonListResponse,
-    PersonMapResponse, PersonYearRangeResponse, PhotoGalleryResponse,
-    PhotoGalleryCreate,
+    PersonMapResponse, PersonNearbyResponse, PersonYearRangeResponse, PhotoGalleryResponse,
+    PhotoGalleryCreate, GalleryPhotoItem, GalleryUpdate, PersonChangesResponse, PersonBatchRequest, PersonBatchResponse,
+    PersonBulkFilter, PersonBulkRequest, PersonBulkResponse,
 )
-from .stats import StatsResponse, EraResponse
+from .stats import StatsResponse, EraResponse, CategoryResponse, DictionariesResponse, QueryStatsResponse
+from .job import JobCreate, JobResponse, JobListResponse
 
 __all__ = [
     "LoginRequest", "TokenResponse",
     "PersonCreate", "PersonUpdate", "PersonResponse", "PersonListResponse",
-    "PersonMapResponse", "PersonYearRangeResponse",
-    "PhotoGalleryResponse", "PhotoGalleryCreate",
-    "StatsResponse", "EraResponse",
+    "PersonMapResponse", "PersonNearbyResponse", "PersonYearRangeResponse", "PersonChangesResponse",
+    "PersonBatchRequest", "PersonBatchResponse",
+    "PersonBulkFilter", "PersonBulkRequest", "PersonBulkResponse",
+    "PhotoGalleryResponse", "PhotoGalleryCreate", "GalleryPhotoItem", "GalleryUpdate",
+    "StatsResponse", "EraResponse", "CategoryResponse", "DictionariesResponse", "QueryStatsResponse",
+    "JobCreate", "JobResponse", "JobListResponse",
 ]
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+
+class JobCreate(BaseModel):
+    kind: str = Field(..., min_length=1, max_length=100)
+    payload: dict[str, Any] = Field(default_factory=dict)
+    max_attempts: Optional[int] = Field(None, ge=1, le=20)
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    worker: Optional[str] = None
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class JobListResponse(BaseModel):
+    items: list[JobResponse]
+    # Jobs per status over the whole table, for the admin UI's counters.
+    counts: dict[str, int]
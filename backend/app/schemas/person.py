@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class PhotoGalleryCreate(BaseModel):
@@ -11,6 +11,24 @@ class PhotoGalleryCreate(BaseModel):
     display_order: int = 0
 
 
+class GalleryPhotoItem(BaseModel):
+    """An existing photo (id) or a new one (photo_url); position in the list is its display_order."""
+    id: Optional[UUID] = None
+    photo_url: Optional[str] = None
+    caption: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_reference(self):
+        if self.id is None and not self.photo_url:
+            raise ValueError("Each photo needs an id or a photo_url")
+        return self
+
+
+class GalleryUpdate(BaseModel):
+    """Full ordered gallery; existing photos left out are deleted."""
+    photos: list[GalleryPhotoItem]
+
+
 class PhotoGalleryResponse(BaseModel):
     id: UUID
     photo_url: str
@@ -37,8 +55,11 @@ class PersonCreate(BaseModel):
     description: str
     activity_description: Optional[str] = None
     short_bio: Optional[str] = None
+    # Either the name or the code; without an era one is assigned from the lifespan.
     era: Optional[str] = None
     category: Optional[str] = None
+    era_code: Optional[int] = None
+    category_code: Optional[int] = None
 
 
 class PersonUpdate(BaseModel):
@@ -60,6 +81,8 @@ class PersonUpdate(BaseModel):
     short_bio: Optional[str] = None
     era: Optional[str] = None
     category: Optional[str] = None
+    era_code: Optional[int] = None
+    category_code: Optional[int] = None
     is_published: Optional[bool] = None
 
 
@@ -83,6 +106,10 @@ class PersonResponse(BaseModel):
     short_bio: Optional[str] = None
     era: Optional[str] = None
     category: Optional[str] = None
+    era_code: Optional[int] = None
+    category_code: Optional[int] = None
+    # The era was assigned from the lifespan rather than chosen.
+    era_auto: bool = False
     is_published: bool
     created_at: datetime
     updated_at: datetime
@@ -100,7 +127,7 @@ class PersonListResponse(BaseModel):
 
 
 class PersonMapResponse(BaseModel):
-    """Lightweight person data for map markers."""
+    """Lightweight person data for map markers; era and category as codes (see /api/dictionaries)."""
     id: UUID
     name: str
     birth_year: int
@@ -109,18 +136,79 @@ class PersonMapResponse(BaseModel):
     birth_lon: Optional[float] = None
     main_photo_url: str
     activity_description: Optional[str] = None
-    era: Optional[str] = None
-    category: Optional[str] = None
+    era_code: Optional[int] = None
+    category_code: Optional[int] = None
 
     model_config = {"from_attributes": True}
 
 
+class PersonNearbyResponse(PersonMapResponse):
+    """Map record with the distance from the queried point to the birthplace."""
+    distance_km: float
+
+
 class PersonYearRangeResponse(BaseModel):
     """Minimal birth/death years for timeline visualization."""
     id: UUID
     name: str
     birth_year: int
     death_year: int
-    era: Optional[str] = None
+    era_code: Optional[int] = None
 
     model_config = {"from_attributes": True}
+
+
+class PersonChangesResponse(BaseModel):
+    """Delta since a cursor: upserted map records and ids to drop."""
+    cursor: datetime
+    full_resync: bool = False
+    upserts: list[PersonMapResponse]
+    deleted: list[UUID]
+
+
+class PersonBatchRequest(BaseModel):
+    ids: list[UUID]
+
+
+class PersonBatchResponse(BaseModel):
+    """Published persons in request order; `missing` lists unknown or unpublished ids."""
+    items: list[PersonResponse]
+    missing: list[UUID]
+
+
+class PersonBulkFilter(BaseModel):
+    """Persons matching all given conditions; the year range selects lifespans overlapping it."""
+    # Empty strings would add no condition, so they are rejected rather than ignored.
+    era: Optional[str] = Field(None, min_length=1)
+    category: Optional[str] = Field(None, min_length=1)
+    era_code: Optional[int] = None
+    category_code: Optional[int] = None
+    search: Optional[str] = Field(None, min_length=1)
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    is_published: Optional[bool] = None
+
+
+class PersonBulkRequest(BaseModel):
+    operation: Literal["publish", "unpublish", "set_era", "set_category", "delete"]
+    ids: Optional[list[UUID]] = None
+    filter: Optional[PersonBulkFilter] = None
+    # Era name (set_era) or category slug (set_category), 422 if unknown; null clears the
+    # category or makes the era automatic again (classified by lifespan).
+    value: Optional[str] = None
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Pass either ids or filter")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("filter needs at least one condition")
+        return self
+
+
+class PersonBulkResponse(BaseModel):
+    operation: str
+    matched: int
+    affected: int
+    dry_run: bool
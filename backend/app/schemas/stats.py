@@ -1,9 +1,15 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class EraCount(BaseModel):
+    """Persons per era or category: its name or slug, code and label (categories) or color (eras)."""
     era: str
     count: int
+    code: Optional[int] = None
+    label: Optional[str] = None
+    color: Optional[str] = None
 
 
 class StatsResponse(BaseModel):
@@ -14,7 +20,39 @@ class StatsResponse(BaseModel):
 
 
 class EraResponse(BaseModel):
+    code: int
     name: str
     start_year: int
     end_year: int
     color: str
+    # Published persons of the era.
+    count: int = 0
+
+
+class CategoryResponse(BaseModel):
+    code: int
+    slug: str
+    label: str
+    count: int = 0
+
+
+class DictionariesResponse(BaseModel):
+    """Names for the era and category codes carried by person records."""
+    eras: list[EraResponse]
+    categories: list[CategoryResponse]
+
+
+class QueryStat(BaseModel):
+    statement: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow_calls: int
+    last_plan: Optional[list[str]] = None
+
+
+class QueryStatsResponse(BaseModel):
+    enabled: bool
+    threshold_ms: float
+    items: list[QueryStat]
@@ -0,0 +1,247 @@
+"""Admission control for the public API.
+
+Every public request passes three checks before it reaches a route:
+
+  * a token bucket per client IP (X-Real-IP from nginx): RATE_LIMIT_PER_SECOND
+    sustained with bursts of RATE_LIMIT_BURST, else 429;
+  * a cap of ROUTE_MAX_IN_FLIGHT concurrent requests per route, else 503;
+  * load shedding: a public request waits at most POOL_WAIT_SHED_MS for a
+    database connection before it is answered 503, and while such waits are
+    happening new requests get 503 without joining the queue.
+
+Rejections carry Retry-After, so one scraper or a fast timeline drag spends
+its own budget instead of everyone's latency. Admin, auth, health and
+thumbnail (/api/img) routes are never limited. Limits are per worker process.
+"""
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+import orjson
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+
+# /api/img: a map view loads one thumbnail per visible marker, which would spend a visitor's
+# whole burst; those responses come from the disk cache and are bounded by the size allowlist.
+EXEMPT_PREFIXES = ("/api/admin", "/api/auth", "/api/health", "/api/ready", "/api/debug", "/api/img")
+# Route keys keep this many path segments, e.g. /api/persons/{} or /api/img/{}.
+ROUTE_SEGMENTS = 3
+# Route keys come from raw paths, so a client inventing paths could add keys without end;
+# rejections beyond this many distinct routes are counted under OTHER_ROUTES.
+MAX_TRACKED_ROUTES = 100
+OTHER_ROUTES = "(other)"
+
+# Seconds a request may wait for a pooled connection; None for the pool's own timeout.
+pool_wait_limit: ContextVar[float | None] = ContextVar("pool_wait_limit", default=None)
+
+
+class PoolWaitExceeded(PoolTimeoutError):
+    pass
+
+
+class PoolWaits:
+    """Connection-pool wait times, fed by MeasuredQueuePool."""
+
+    def __init__(self):
+        self._waiting: dict[int, float] = {}
+        self._tokens = itertools.count()
+        self.acquired = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Exponentially weighted recent wait, so old bursts fade out.
+        self.recent_ms = 0.0
+
+    def start(self) -> int:
+        token = next(self._tokens)
+        self._waiting[token] = time.perf_counter()
+        return token
+
+    def finish(self, token: int):
+        elapsed_ms = (time.perf_counter() - self._waiting.pop(token)) * 1000
+        self.acquired += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent_ms = 0.8 * self.recent_ms + 0.2 * elapsed_ms
+
+    def oldest_wait_ms(self) -> float:
+        if not self._waiting:
+            return 0.0
+        return (time.perf_counter() - min(self._waiting.values())) * 1000
+
+    def saturated(self, threshold_ms: float) -> bool:
+        """True while callers are queued and the queue has been slow."""
+        return bool(self._waiting) and max(self.oldest_wait_ms(), self.recent_ms) > threshold_ms
+
+    def stats(self) -> dict:
+        return {
+            "waiting": len(self._waiting),
+            "oldest_wait_ms": round(self.oldest_wait_ms(), 1),
+            "recent_wait_ms": round(self.recent_ms, 1),
+            "max_wait_ms": round(self.max_ms, 1),
+            "avg_wait_ms": round(self.total_ms / self.acquired, 3) if self.acquired else None,
+            "acquired": self.acquired,
+        }
+
+
+pool_waits = PoolWaits()
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """The default asyncio pool, timing each checkout and honouring pool_wait_limit."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._default_timeout = self._timeout
+
+    def _do_get(self):
+        limit = pool_wait_limit.get()
+        # Read by QueuePool._do_get before its first await, so concurrent checkouts don't mix values.
+        self._timeout = self._default_timeout if limit is None else limit
+        token = pool_waits.start()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError as e:
+            if limit is None:
+                raise
+            raise PoolWaitExceeded(str(e)) from e
+        finally:
+            pool_waits.finish(token)
+
+
+def route_key(path: str) -> str:
+    """Group paths by route: ids, sizes and file names collapse into {}."""
+    segments = path.strip("/").split("/")[:ROUTE_SEGMENTS]
+    return "/" + "/".join("{}" if any(ch.isdigit() for ch in s) else s for s in segments)
+
+
+class AdmissionController:
+    def __init__(self):
+        # ip -> [tokens, last refill time], least recently seen first.
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        # Only routes with requests in flight have an entry.
+        self.in_flight: dict[str, int] = {}
+        self.admitted = 0
+        self.rejected = {"rate_limited": 0, "route_busy": 0, "shed": 0, "pool_timeout": 0}
+        self.rejected_by_route: dict[str, int] = {}
+
+    def _take_token(self, client: str) -> float:
+        """0 if the client may proceed, else seconds until its next token."""
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [float(settings.RATE_LIMIT_BURST), now]
+            if len(self._buckets) > settings.ADMISSION_MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(settings.RATE_LIMIT_BURST, bucket[0] + (now - bucket[1]) * settings.RATE_LIMIT_PER_SECOND)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / settings.RATE_LIMIT_PER_SECOND
+
+    def check(self, client: str, route: str) -> tuple[int, str, int] | None:
+        """None to admit, else (status, reason, retry_after_seconds)."""
+        if pool_waits.saturated(settings.POOL_WAIT_SHED_MS):
+            return 503, "shed", 1
+        if self.in_flight.get(route, 0) >= settings.ROUTE_MAX_IN_FLIGHT:
+            return 503, "route_busy", 1
+        wait = self._take_token(client)
+        if wait:
+            return 429, "rate_limited", max(1, math.ceil(wait))
+        return None
+
+    def enter(self, route: str):
+        self.admitted += 1
+        self.in_flight[route] = self.in_flight.get(route, 0) + 1
+
+    def leave(self, route: str):
+        remaining = self.in_flight[route] - 1
+        if remaining:
+            self.in_flight[route] = remaining
+        else:
+            del self.in_flight[route]
+
+    def reject(self, route: str, reason: str):
+        self.rejected[reason] += 1
+        if route not in self.rejected_by_route and len(self.rejected_by_route) >= MAX_TRACKED_ROUTES:
+            route = OTHER_ROUTES
+        self.rejected_by_route[route] = self.rejected_by_route.get(route, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.ADMISSION_CONTROL,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "rejected_by_route": dict(self.rejected_by_route),
+            "in_flight": dict(self.in_flight),
+            "clients": len(self._buckets),
+            "pool": pool_waits.stats(),
+        }
+
+
+admission = AdmissionController()
+
+
+def _client_ip(scope) -> str:
+    if settings.ADMISSION_TRUST_X_REAL_IP:
+        for name, value in scope["headers"]:
+            if name == b"x-real-ip":
+                return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission controller to public API requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/") or path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(path)
+        verdict = admission.check(_client_ip(scope), route)
+        if verdict is not None:
+            await self._reject(send, route, *verdict)
+            return
+
+        admission.enter(route)
+        started = False
+
+        async def send_tracking(message):
+            nonlocal started
+            started = True
+            await send(message)
+
+        pool_wait_limit.set(settings.POOL_WAIT_SHED_MS / 1000)
+        try:
+            await self.app(scope, receive, send_tracking)
+        except PoolWaitExceeded:
+            if started:
+                raise
+            await self._reject(send, route, 503, "pool_timeout", 1)
+        finally:
+            admission.leave(route)
+
+    @staticmethod
+    async def _reject(send, route: str, status: int, reason: str, retry_after: int):
+        admission.reject(route, reason)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": orjson.dumps({"detail": reason})})
@@ -0,0 +1,341 @@
+"""In-process cache of encoded public responses.
+
+Entries are tagged with the entity family they were built from ("persons",
+"settings", ...) and dropped by the change feed when that family changes in
+any worker. Compressed variants live in the same entries and are bounded,
+together with the raw bytes, by RESPONSE_CACHE_MAX_BYTES. Until the change
+feed has confirmed the current dataset version the cache stays disabled, so
+a worker that cannot see invalidations never serves stale data.
+
+Misses are single-flight: concurrent requests for one key (a popular year
+right after an invalidation or a deploy) wait for the first one's query and
+share its bytes instead of each running the same query.
+"""
+import asyncio
+import gzip
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from app.config import settings
+from app.services.change_feed import Change, register_invalidator, register_caching_switch
+from app.services.serialization import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _compressors() -> dict[str, Callable[[bytes], bytes]]:
+    compressors = {"gzip": lambda body: gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if zstandard is not None:
+        compressors["zstd"] = lambda body: zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(body)
+    return compressors
+
+
+COMPRESSORS = _compressors()
+# Tie-break between encodings the client accepts with equal q, smallest output first.
+PREFERENCE = ("br", "zstd", "gzip")
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Pick a supported Content-Encoding for an Accept-Encoding header, None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CacheEntry:
+    __slots__ = ("body", "tag", "variants", "pending")
+
+    def __init__(self, body: bytes, tag: str):
+        self.body = body
+        self.tag = tag
+        self.variants: dict[str, bytes] = {}
+        self.pending: dict[str, asyncio.Task] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = False
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        # Bumped on every invalidation; a value computed across a bump may be stale.
+        self.generation = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.encodings = {
+            encoding: {"hits": 0, "compressions": 0, "compress_ms": 0.0, "bytes_in": 0, "bytes_out": 0}
+            for encoding in COMPRESSORS
+        }
+
+    def get(self, key: str) -> CacheEntry | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, body: bytes, tag: str, generation: int | None = None) -> CacheEntry | None:
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return None
+        if len(body) > self.max_bytes:
+            return None
+        existing = self._entries.get(key)
+        if existing is not None and existing.body == body:
+            # Concurrent misses computed the same payload; keep the variants already made.
+            self._entries.move_to_end(key)
+            return existing
+        self._drop(key)
+        entry = CacheEntry(body, tag)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._evict()
+        return entry
+
+    async def variant(self, key: str, entry: CacheEntry, encoding: str) -> bytes:
+        """`entry.body` compressed with `encoding`, compressing at most once per entry."""
+        data = entry.variants.get(encoding)
+        if data is not None:
+            self.encodings[encoding]["hits"] += 1
+            return data
+        task = entry.pending.get(encoding)
+        if task is None:
+            task = asyncio.ensure_future(self._compress(key, entry, encoding))
+            entry.pending[encoding] = task
+        return await asyncio.shield(task)
+
+    async def _compress(self, key: str, entry: CacheEntry, encoding: str) -> bytes:
+        started = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(COMPRESSORS[encoding], entry.body)
+        finally:
+            entry.pending.pop(encoding, None)
+        stats = self.encodings[encoding]
+        stats["compressions"] += 1
+        stats["compress_ms"] += (time.perf_counter() - started) * 1000
+        stats["bytes_in"] += len(entry.body)
+        stats["bytes_out"] += len(data)
+        # The entry may have been invalidated or evicted while compressing.
+        if self._entries.get(key) is entry:
+            entry.variants[encoding] = data
+            self.bytes += len(data)
+            self._evict()
+        return data
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def invalidate(self, tag: str | None = None):
+        """Drop entries built from `tag`, or everything when tag is None."""
+        self.generation += 1
+        if tag is None:
+            self._entries.clear()
+            self.bytes = 0
+            return
+        for key in [k for k, entry in self._entries.items() if entry.tag == tag]:
+            self._drop(key)
+
+    def set_enabled(self, enabled: bool):
+        if not enabled:
+            self.invalidate()
+        self.enabled = enabled
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "encodings": {
+                encoding: {
+                    **stats,
+                    "compress_ms": round(stats["compress_ms"], 1),
+                    "ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None,
+                }
+                for encoding, stats in self.encodings.items()
+            },
+        }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+class _LeaderGone(Exception):
+    """The request computing a flight was cancelled; one of its waiters takes over."""
+
+
+class SingleFlight:
+    """Concurrent computations of one key share a single run.
+
+    The first caller computes in its own request, with its own database
+    session; callers arriving meanwhile await its result or its exception
+    without touching the database. A flight started before an invalidation
+    (older cache generation) is not joined, so nobody gets data older than
+    their request.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, tuple[int, asyncio.Future]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.takeovers = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def run(self, key: str, generation: int, compute: Callable[[], Awaitable], timeout: float):
+        while True:
+            flight = self._flights.get(key)
+            if flight is None or flight[0] != generation:
+                break
+            self.coalesced += 1
+            try:
+                async with asyncio.timeout(timeout):
+                    return await asyncio.shield(flight[1])
+            except _LeaderGone:
+                self.takeovers += 1
+            except TimeoutError:
+                self.timeouts += 1
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Marks the exception retrieved, so a flight nobody joined doesn't log a warning.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._flights[key] = (generation, future)
+        self.leaders += 1
+        try:
+            async with asyncio.timeout(timeout):
+                result = await compute()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderGone())
+            raise
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                self.timeouts += 1
+            else:
+                self.errors += 1
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key, (None, None))[1] is future:
+                del self._flights[key]
+
+    def stats(self) -> dict:
+        requests = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "computations": self.leaders,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+            "takeovers": self.takeovers,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+single_flight = SingleFlight()
+
+# Set on every cached response, compressed or not: the bytes depend on Accept-Encoding.
+VARY = {"Vary": "Accept-Encoding"}
+
+
+async def cached_json(
+    key: str, tag: str, compute: Callable[[], Awaitable], accept_encoding: str | None = None,
+) -> Response:
+    """Serve `key` from the cache, or compute, encode and remember it.
+
+    Concurrent misses of one key run `compute` once (see SingleFlight). Cached
+    bodies of at least RESPONSE_COMPRESSION_MIN_BYTES are sent in the best
+    encoding the client accepts; compressed variants are kept alongside the raw
+    bytes, so each payload is compressed once per encoding until invalidated.
+    """
+    async def encode() -> bytes:
+        return dumps(await compute())
+
+    return await cached_body(key, tag, encode, accept_encoding)
+
+
+async def cached_body(
+    key: str, tag: str, compute: Callable[[], Awaitable[bytes]], accept_encoding: str | None = None,
+) -> Response:
+    """cached_json for a `compute` that returns the JSON body already encoded."""
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation
+        try:
+            body = await single_flight.run(key, generation, compute, settings.SINGLE_FLIGHT_TIMEOUT_SECONDS)
+        except TimeoutError:
+            raise HTTPException(status_code=503, detail="Response took too long", headers={"Retry-After": "1"})
+        entry = response_cache.set(key, body, tag, generation)
+        if entry is None:
+            return Response(body, media_type="application/json", headers=VARY)
+
+    encoding = negotiate(accept_encoding) if len(entry.body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding is None:
+        return Response(entry.body, media_type="application/json", headers=VARY)
+    body = await response_cache.variant(key, entry, encoding)
+    return Response(body, media_type="application/json", headers={**VARY, "Content-Encoding": encoding})
+
+
+def _on_change(change: Change | None):
+    response_cache.invalidate(change.entity if change else None)
+
+
+register_invalidator(_on_change)
+register_caching_switch(response_cache.set_enabled)
@@ -0,0 +1,171 @@
+"""Cross-worker change notifications over Postgres LISTEN/NOTIFY.
+
+Admin writes call publish_change() inside their transaction: it bumps the
+single-row dataset_version counter and queues a NOTIFY that Postgres delivers
+on commit. Every worker runs a dedicated asyncpg listener that forwards each
+change to the registered invalidators, reconnecting with exponential backoff.
+A poller compares the stored version with the local one at a fixed interval,
+so missed notifications (listener down, reconnect gaps) still invalidate local
+caches within CHANGE_POLL_INTERVAL_SECONDS.
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import select, update, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.dataset_version import DatasetVersion
+
+CHANNEL = "timeline_changes"
+MAX_BACKOFF_SECONDS = 60
+
+
+@dataclass
+class Change:
+    version: int
+    entity: str
+    entity_id: str | None = None
+    op: str = "update"
+
+
+# Called with a Change, or with None when the exact changes are unknown
+# (version gap, reconnect) and everything must be treated as stale.
+_invalidators: list[Callable[[Change | None], None]] = []
+_state = {"version": None, "listening": False, "notifications": 0, "full_invalidations": 0}
+
+
+def register_invalidator(fn: Callable[[Change | None], None]):
+    _invalidators.append(fn)
+
+
+def local_version() -> int | None:
+    return _state["version"]
+
+
+def change_feed_status() -> dict:
+    return dict(_state)
+
+
+async def publish_change(db: AsyncSession, entity: str, entity_id=None, op: str = "update") -> int:
+    """Bump the dataset version and notify all workers once the transaction commits."""
+    version = (await db.execute(
+        update(DatasetVersion)
+        .where(DatasetVersion.id == 1)
+        .values(version=DatasetVersion.version + 1, updated_at=func.now())
+        .returning(DatasetVersion.version)
+    )).scalar_one()
+    payload = {"v": version, "entity": entity, "id": str(entity_id) if entity_id else None, "op": op}
+    await db.execute(select(func.pg_notify(CHANNEL, json.dumps(payload))))
+    return version
+
+
+def _dispatch(change: Change | None):
+    if change is None:
+        _state["full_invalidations"] += 1
+    for fn in _invalidators:
+        try:
+            fn(change)
+        except Exception as e:
+            print(f"[CHANGE FEED] Invalidator {fn.__name__} failed: {e}")
+
+
+def _apply_version(version: int, change: Change | None = None):
+    current = _state["version"]
+    if current is not None and version <= current:
+        return
+    # A single-step change can be applied precisely; anything else may have
+    # skipped notifications, so every cache starts over.
+    precise = change is not None and current is not None and version == current + 1
+    _state["version"] = version
+    _dispatch(change if precise else None)
+
+
+def _on_notify(connection, pid, channel, payload):
+    try:
+        data = json.loads(payload)
+        change = Change(version=int(data["v"]), entity=data["entity"], entity_id=data.get("id"), op=data.get("op", "update"))
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"[CHANGE FEED] Malformed notification {payload!r}: {e}")
+        return
+    _state["notifications"] += 1
+    _apply_version(change.version, change)
+
+
+def _listener_dsn() -> str:
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def _listen_forever():
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(_listener_dsn())
+            await conn.add_listener(CHANNEL, _on_notify)
+            _state["listening"] = True
+            backoff = 1
+            print(f"[CHANGE FEED] Listening on '{CHANNEL}'")
+            while not conn.is_closed():
+                await asyncio.sleep(settings.CHANGE_POLL_INTERVAL_SECONDS)
+                # Cheap keepalive: surfaces dead connections the socket hasn't noticed yet.
+                await conn.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[CHANGE FEED] Listener error: {e}; reconnecting in {backoff}s")
+        finally:
+            _state["listening"] = False
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+
+async def fetch_version() -> int:
+    async with async_session() as session:
+        return (await session.execute(
+            select(DatasetVersion.version).where(DatasetVersion.id == 1)
+        )).scalar_one()
+
+
+async def _poll_forever():
+    while True:
+        try:
+            _apply_version(await fetch_version())
+            set_caching_enabled(True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Without a readable version nothing can be invalidated reliably.
+            set_caching_enabled(False)
+            print(f"[CHANGE FEED] Version poll failed, local caches disabled: {e}")
+        await asyncio.sleep(settings.CHANGE_POLL_INTERVAL_SECONDS)
+
+
+_caching_hooks: list[Callable[[bool], None]] = []
+
+
+def register_caching_switch(fn: Callable[[bool], None]):
+    """fn(enabled) is called whenever the feed can or can no longer vouch for local caches."""
+    _caching_hooks.append(fn)
+
+
+def set_caching_enabled(enabled: bool):
+    for fn in _caching_hooks:
+        fn(enabled)
+
+
+def start_change_feed() -> list[asyncio.Task]:
+    if not settings.CHANGE_FEED_ENABLED:
+        return []
+    return [
+        asyncio.create_task(_listen_forever()),
+        asyncio.create_task(_poll_forever()),
+    ]
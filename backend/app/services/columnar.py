@@ -0,0 +1,336 @@
+"""Memory-mapped columnar copy of the public map datasets, shared by all workers.
+
+A dataset file holds the published map records (ordered by name, as
+/api/persons returns them) and the timeline markers (ordered by birth year)
+as columns:
+
+    map.birth, map.death          int32     lifespan filter for /api/persons?year=
+    map.lat, map.lon              float32
+    map.era, map.category         int16     dictionary codes, -1 for none
+    map.offsets, map.json         int64, uint8
+    markers.birth, markers.death  int32
+    markers.era                   int16
+    markers.offsets, markers.json int64, uint8
+
+`*.json` is every record pre-encoded as a JSON object followed by a comma and
+`*.offsets` marks where each one starts. A response is assembled by slicing
+that buffer: the markers are one slice, a year is the records picked by a
+vectorized mask over the lifespan columns. No Python objects are built per
+row and no worker keeps its own copy: every worker maps the same file
+read-only, so the page cache holds it once.
+
+Files live in COLUMNAR_DIR as dataset-v<dataset version>-<stamp>.bin, the
+`current` symlink points at the newest. When the change feed reports a
+persons change, the next request starts a rebuild in the background and is
+answered from the database meanwhile. One worker rebuilds under an flock,
+writes the new file next to the old one and swaps the symlink with an atomic
+rename; the others map the new file when they see it. Replaced files are
+unlinked after COLUMNAR_KEEP_VERSIONS, which leaves existing mappings valid.
+"""
+import asyncio
+import fcntl
+import mmap
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import orjson
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import engine
+from app.models.dataset_version import DatasetVersion
+from app.models.person import Person
+from app.services.change_feed import Change, fetch_version, local_version, register_caching_switch, register_invalidator
+from app.services.readiness import register_warmup
+from app.services.serialization import MAP_FIELDS, YEAR_RANGE_FIELDS, dumps, person_columns, rows_to_dicts
+
+MAGIC = b"HMCOL01\n"
+ALIGN = 64
+CURRENT = "current"
+LOCK = ".lock"
+FILE_NAME = re.compile(r"dataset-v(\d+)-\d+T\d+\.bin$")
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def _fragments(records: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """(offsets, buffer): each record as a JSON object plus a trailing comma."""
+    encoded = [dumps(record) + b"," for record in records]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _codes(records: list[dict], field: str) -> np.ndarray:
+    return np.array([-1 if r[field] is None else r[field] for r in records], dtype=np.int16)
+
+
+def encode_dataset(version: int, persons: list[dict], markers: list[dict]) -> bytes:
+    map_offsets, map_json = _fragments(persons)
+    marker_offsets, marker_json = _fragments(markers)
+    sections = {
+        "map.birth": np.array([r["birth_year"] for r in persons], dtype=np.int32),
+        "map.death": np.array([r["death_year"] for r in persons], dtype=np.int32),
+        "map.lat": np.array([r["birth_lat"] for r in persons], dtype=np.float32),
+        "map.lon": np.array([r["birth_lon"] for r in persons], dtype=np.float32),
+        "map.era": _codes(persons, "era_code"),
+        "map.category": _codes(persons, "category_code"),
+        "map.offsets": map_offsets,
+        "map.json": map_json,
+        "markers.birth": np.array([r["birth_year"] for r in markers], dtype=np.int32),
+        "markers.death": np.array([r["death_year"] for r in markers], dtype=np.int32),
+        "markers.era": _codes(markers, "era_code"),
+        "markers.offsets": marker_offsets,
+        "markers.json": marker_json,
+    }
+    layout, position = {}, 0
+    for name, array in sections.items():
+        layout[name] = {"offset": position, "dtype": array.dtype.str, "length": len(array)}
+        position = _align(position + array.nbytes)
+    header = orjson.dumps({
+        "dataset_version": version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "sections": layout,
+    })
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    out = bytearray(data_start + position)
+    out[:len(MAGIC)] = MAGIC
+    out[len(MAGIC):len(MAGIC) + 8] = len(header).to_bytes(8, "little")
+    out[len(MAGIC) + 8:len(MAGIC) + 8 + len(header)] = header
+    for name, array in sections.items():
+        start = data_start + layout[name]["offset"]
+        out[start:start + array.nbytes] = array.tobytes()
+    return bytes(out)
+
+
+class ColumnarDataset:
+    """One dataset file, mapped read-only; the arrays are views into the mapping."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a dataset file")
+        header_len = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 8], "little")
+        header = orjson.loads(self._mm[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+        data_start = _align(len(MAGIC) + 8 + header_len)
+        self.version: int = header["dataset_version"]
+        self.built_at: str = header["built_at"]
+        self.columns = {
+            name: np.frombuffer(self._mm, dtype=spec["dtype"], count=spec["length"], offset=data_start + spec["offset"])
+            for name, spec in header["sections"].items()
+        }
+        self._map_json = memoryview(self.columns["map.json"])
+        self._markers_json = memoryview(self.columns["markers.json"])
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+    def persons_alive(self, year: int) -> bytes:
+        """JSON array of the map records alive in `year`, in name order."""
+        birth, death = self.columns["map.birth"], self.columns["map.death"]
+        picked = np.flatnonzero((birth <= year) & (death >= year))
+        if not len(picked):
+            return b"[]"
+        offsets = self.columns["map.offsets"]
+        buffer = self._map_json
+        body = b"".join([
+            buffer[start:end] for start, end in zip(offsets[picked].tolist(), offsets[picked + 1].tolist())
+        ])
+        # Drop the last record's trailing comma.
+        return b"".join((b"[", memoryview(body)[:-1], b"]"))
+
+    def markers(self) -> bytes:
+        """JSON array of all timeline markers: one slice of the buffer."""
+        if not len(self._markers_json):
+            return b"[]"
+        return b"".join((b"[", self._markers_json[:-1], b"]"))
+
+
+class ColumnarStore:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.dataset: ColumnarDataset | None = None
+        # Oldest dataset version that still has every persons change; older files are stale.
+        self.required = 0
+        # False while the change feed cannot vouch for `required`.
+        self.trusted = False
+        self._refresh: asyncio.Task | None = None
+        self.builds = 0
+        self.build_ms = 0.0
+        self.swaps = 0
+        self.hits = 0
+        self.fallbacks = 0
+
+    def current(self) -> ColumnarDataset | None:
+        """The mapped dataset if it is up to date, else None (and a refresh starts in the background)."""
+        if not settings.COLUMNAR_DATASET or not self.trusted:
+            self.fallbacks += 1
+            return None
+        dataset = self.dataset
+        if dataset is not None and dataset.version >= self.required:
+            self.hits += 1
+            return dataset
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.get_running_loop().create_task(self.refresh(wait=False))
+        self.fallbacks += 1
+        return None
+
+    def _current_file(self) -> tuple[Path, int] | None:
+        try:
+            target = os.readlink(self.directory / CURRENT)
+        except OSError:
+            return None
+        match = FILE_NAME.match(target)
+        return (self.directory / target, int(match.group(1))) if match else None
+
+    def _map_current(self) -> bool:
+        """Map the file `current` points at if it is up to date; True when mapped."""
+        found = self._current_file()
+        if found is None or found[1] < self.required:
+            return False
+        path, _ = found
+        if self.dataset is None or self.dataset.path != path:
+            self.dataset = ColumnarDataset(path)
+            self.swaps += 1
+        return True
+
+    async def refresh(self, wait: bool):
+        """Map an up-to-date file, building one unless another worker is already doing so.
+
+        With `wait`, block until the other worker's build is done instead of returning.
+        """
+        try:
+            if self._map_current():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.directory / LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if wait:
+                    await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                else:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return
+                # Another worker may have finished a build while we waited.
+                if not self._map_current():
+                    await self._build()
+                    self._map_current()
+            finally:
+                os.close(fd)
+        except Exception as e:
+            print(f"[COLUMNAR] Refresh failed, serving from the database: {e}")
+
+    async def _build(self):
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+            async with conn.begin():
+                version = (await conn.execute(
+                    select(DatasetVersion.version).where(DatasetVersion.id == 1)
+                )).scalar_one()
+                persons = (await conn.execute(
+                    select(*person_columns(MAP_FIELDS))
+                    .where(
+                        Person.is_published == True,
+                        Person.birth_lat.isnot(None),
+                        Person.birth_lon.isnot(None),
+                    )
+                    .order_by(Person.name)
+                )).all()
+                markers = (await conn.execute(
+                    select(*person_columns(YEAR_RANGE_FIELDS))
+                    .where(Person.is_published == True)
+                    .order_by(Person.birth_year)
+                )).all()
+        name = f"dataset-v{version}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.bin"
+        # Converting and encoding ~20k rows takes hundreds of ms; keep it off the event loop.
+        size = await asyncio.to_thread(self._encode_and_write, name, version, persons, markers)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.builds += 1
+        self.build_ms += elapsed_ms
+        print(
+            f"[COLUMNAR] Built {name}: {len(persons)} map records, {len(markers)} markers, "
+            f"{size / 1024:.0f} KiB in {elapsed_ms:.0f} ms"
+        )
+
+    def _encode_and_write(self, name: str, version: int, persons: list, markers: list) -> int:
+        persons = rows_to_dicts(persons, MAP_FIELDS)
+        markers = rows_to_dicts(markers, YEAR_RANGE_FIELDS)
+        return self._write(name, encode_dataset(version, persons, markers))
+
+    def _write(self, name: str, data: bytes) -> int:
+        staging = self.directory / f".{name}.tmp"
+        with open(staging, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        staging.rename(self.directory / name)
+        link = self.directory / f".{CURRENT}.tmp"
+        link.unlink(missing_ok=True)
+        link.symlink_to(name)
+        link.rename(self.directory / CURRENT)
+        self._prune(name)
+        return len(data)
+
+    def _prune(self, keep: str):
+        # Workers still mapping a pruned file keep reading it; the space is freed when they let go.
+        files = sorted(
+            (p for p in self.directory.iterdir() if FILE_NAME.match(p.name) and p.name != keep),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for path in files[:max(0, len(files) - settings.COLUMNAR_KEEP_VERSIONS + 1)]:
+            path.unlink(missing_ok=True)
+
+    async def warm(self):
+        if not settings.COLUMNAR_DATASET:
+            return
+        self.required = max(self.required, await fetch_version())
+        await self.refresh(wait=True)
+
+    def stats(self) -> dict:
+        dataset = self.dataset
+        return {
+            "enabled": settings.COLUMNAR_DATASET,
+            "trusted": self.trusted,
+            "required_version": self.required,
+            "version": dataset.version if dataset else None,
+            "file": dataset.path.name if dataset else None,
+            "bytes": dataset.size if dataset else None,
+            "map_records": len(dataset.columns["map.birth"]) if dataset else None,
+            "markers": len(dataset.columns["markers.birth"]) if dataset else None,
+            "builds": self.builds,
+            "avg_build_ms": round(self.build_ms / self.builds, 1) if self.builds else None,
+            "swaps": self.swaps,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+columnar_store = ColumnarStore(settings.COLUMNAR_DIR)
+
+
+def _on_change(change: Change | None):
+    if change is None:
+        columnar_store.required = max(columnar_store.required, local_version() or 0)
+    elif change.entity == "persons":
+        columnar_store.required = max(columnar_store.required, change.version)
+
+
+def _on_caching_switch(enabled: bool):
+    columnar_store.trusted = enabled
+
+
+register_invalidator(_on_change)
+register_caching_switch(_on_caching_switch)
+register_warmup("columnar_dataset", columnar_store.warm)
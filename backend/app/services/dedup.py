@@ -0,0 +1,248 @@
+"""Near-duplicate person detection.
+
+Names are normalized to a transliterated phonetic skeleton ("Рамсес II",
+"Ramesses II" and "Ramses II" all come out close), then candidates are
+blocked instead of comparing all pairs:
+
+  * lifespan blocking: each person goes into birth-year buckets k and k + 1
+    (k = birth_year // DEDUP_BUCKET_YEARS), so two people born less than a
+    bucket apart share at least one bucket, and buckets are independent
+    units of work for the process pool;
+  * trigram blocking: inside a bucket, each person probes an inverted index
+    with its DEDUP_PROBE_TRIGRAMS rarest name trigrams, and only people
+    sharing at least DEDUP_MIN_SHARED_TRIGRAMS of them are scored.
+
+Each pair is reported once, by the bucket max(k_a, k_b). Candidates stream
+out bucket by bucket as workers finish.
+
+Usage:
+    python -m app.services.dedup > candidates.ndjson
+    python -m app.services.dedup --min-score 0.8 --workers 8
+"""
+import argparse
+import asyncio
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import engine
+from app.models.person import Person
+from app.services.jobs import JobContext, register_job
+from app.services.serialization import dumps
+
+_TRANSLIT = str.maketrans({
+    # Cyrillic
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    # Greek (accents are stripped before this table applies)
+    "α": "a", "β": "v", "γ": "g", "δ": "d", "ε": "e", "ζ": "z", "η": "i", "θ": "th", "ι": "i",
+    "κ": "k", "λ": "l", "μ": "m", "ν": "n", "ξ": "x", "ο": "o", "π": "p", "ρ": "r", "σ": "s",
+    "ς": "s", "τ": "t", "υ": "y", "φ": "f", "χ": "h", "ψ": "ps", "ω": "o",
+})
+
+# Spelling variants that transliterations disagree on, reduced to one form.
+_SKELETON = [
+    (re.compile(r"ph"), "f"), (re.compile(r"th"), "t"), (re.compile(r"kh"), "h"),
+    (re.compile(r"ck|c|q"), "k"), (re.compile(r"w"), "v"), (re.compile(r"[yj]"), "i"),
+    (re.compile(r"ou"), "u"), (re.compile(r"ae"), "e"), (re.compile(r"(.)\1+"), r"\1"),
+]
+# Pairs kept in a dedup job's result, best first; the NDJSON endpoint has them all.
+JOB_MAX_PAIRS = 5000
+_ROMAN = re.compile(r"^(?=[ivxlcdm]+$)m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+
+
+def normalize_name(name: str) -> tuple[str, frozenset]:
+    """Phonetic skeleton of `name` and its regnal numbers ("ii", "3", ...)."""
+    # Only upper-case Roman numerals count ("Клеопатра VII"), so "di" or "mix" stay words.
+    numerals = frozenset(
+        t.lower() for t in re.findall(r"\b(?:[IVXLCDM]+|\d+)\b", name) if t.isdigit() or _ROMAN.match(t.lower())
+    )
+    text = unicodedata.normalize("NFKD", name.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).translate(_TRANSLIT)
+    tokens = re.findall(r"[a-z0-9]+", text)
+    words = []
+    for token in tokens:
+        if token in numerals:
+            continue
+        for pattern, repl in _SKELETON:
+            token = pattern.sub(repl, token)
+        words.append(token)
+    return " ".join(words), numerals
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prepare(rows) -> list[tuple]:
+    """(id, name, birth_year, death_year, skeletons, numerals, trigram set) per row."""
+    records = []
+    for person_id, name, name_original, birth_year, death_year in rows:
+        variants = {normalize_name(name)}
+        if name_original:
+            variants.add(normalize_name(name_original))
+        skeletons = sorted({skeleton for skeleton, _ in variants if skeleton})
+        # A regnal number written in either spelling identifies the person.
+        numerals = frozenset().union(*(numerals for _, numerals in variants))
+        grams = set().union(*(trigrams(skeleton) for skeleton in skeletons))
+        records.append((str(person_id), name, birth_year, death_year, skeletons, numerals, grams))
+    return records
+
+
+def name_similarity(a: tuple, b: tuple, floor: float = 0.0) -> float:
+    """Best skeleton similarity of two prepared records, or 0.0 if it cannot reach `floor`."""
+    best = 0.0
+    for skeleton_a in a[4]:
+        for skeleton_b in b[4]:
+            matcher = SequenceMatcher(None, skeleton_a, skeleton_b)
+            # The quick ratios are upper bounds of ratio() at a fraction of its cost.
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= floor:
+                best = floor = ratio
+    return best
+
+
+def score_pair(a: tuple, b: tuple, min_score: float = 0.0) -> tuple[float, float]:
+    """(overall score, name similarity) of two prepared records; (0.0, 0.0) below `min_score`."""
+    year_gap = abs(a[2] - b[2]) + abs(a[3] - b[3])
+    year_score = max(0.0, 1.0 - year_gap / settings.DEDUP_YEAR_TOLERANCE)
+    # Different regnal numbers mean different people (Thutmose I vs Thutmose II).
+    penalty = 0.5 if a[5] and b[5] and a[5] != b[5] else 1.0
+    needed = (min_score - 0.2 * year_score) / (0.8 * penalty)
+    if needed > 1.0:
+        return 0.0, 0.0
+    name_score = name_similarity(a, b, needed) * penalty
+    return 0.8 * name_score + 0.2 * year_score, name_score
+
+
+def bucket_of(birth_year: int) -> int:
+    return birth_year // settings.DEDUP_BUCKET_YEARS
+
+
+def analyze_bucket(bucket: int, records: list[tuple], min_score: float) -> list[dict]:
+    """Score the candidate pairs of one lifespan bucket (runs in a worker process)."""
+    index: dict[str, list[int]] = defaultdict(list)
+    for i, record in enumerate(records):
+        for gram in record[6]:
+            index[gram].append(i)
+
+    found = []
+    seen: set[tuple[int, int]] = set()
+    for i, a in enumerate(records):
+        # Probing only the rarest trigrams keeps the work per person bounded
+        # even in crowded buckets; common trigrams say little about identity.
+        probes = sorted(
+            (gram for gram in a[6] if len(index[gram]) <= settings.DEDUP_MAX_TRIGRAM_FREQUENCY),
+            key=lambda gram: len(index[gram]),
+        )[:settings.DEDUP_PROBE_TRIGRAMS]
+        shared: dict[int, int] = defaultdict(int)
+        for gram in probes:
+            for j in index[gram]:
+                if j != i:
+                    shared[j] += 1
+        for j, count in shared.items():
+            pair = (i, j) if i < j else (j, i)
+            if count < settings.DEDUP_MIN_SHARED_TRIGRAMS or pair in seen:
+                continue
+            seen.add(pair)
+            b = records[j]
+            if max(bucket_of(a[2]), bucket_of(b[2])) != bucket:
+                continue
+            score, name_score = score_pair(a, b, min_score)
+            if score >= min_score:
+                found.append({
+                    "score": round(score, 4),
+                    "name_score": round(name_score, 4),
+                    "a": {"id": a[0], "name": a[1], "birth_year": a[2], "death_year": a[3]},
+                    "b": {"id": b[0], "name": b[1], "birth_year": b[2], "death_year": b[3]},
+                })
+    found.sort(key=lambda pair: pair["score"], reverse=True)
+    return found
+
+
+def block_by_lifespan(records: list[tuple]) -> dict[int, list[tuple]]:
+    buckets: dict[int, list[tuple]] = defaultdict(list)
+    for record in records:
+        k = bucket_of(record[2])
+        buckets[k].append(record)
+        buckets[k + 1].append(record)
+    return buckets
+
+
+async def load_records() -> list[tuple]:
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            select(Person.id, Person.name, Person.name_original, Person.birth_year, Person.death_year)
+        )).all()
+    return await asyncio.to_thread(prepare, rows)
+
+
+async def find_duplicates(
+    min_score: float | None = None, workers: int | None = None,
+    progress: Callable[[float, str], None] | None = None,
+) -> AsyncIterator[dict]:
+    """Yield candidate pairs, each bucket's best first, as the process pool finishes buckets.
+
+    `progress(fraction, message)` is called as buckets finish.
+    """
+    min_score = settings.DEDUP_MIN_SCORE if min_score is None else min_score
+    buckets = block_by_lifespan(await load_records())
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=workers or settings.DEDUP_WORKERS)
+    try:
+        futures = [
+            loop.run_in_executor(pool, analyze_bucket, bucket, records, min_score)
+            for bucket, records in buckets.items() if len(records) > 1
+        ]
+        for done, future in enumerate(asyncio.as_completed(futures), 1):
+            for pair in await future:
+                yield pair
+            if progress:
+                progress(done / len(futures), f"{done} of {len(futures)} buckets")
+    finally:
+        # Not `with`: its shutdown(wait=True) would block the event loop when a client disconnects.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _dedup_job(job: JobContext) -> dict:
+    pairs = [pair async for pair in find_duplicates(job.payload.get("min_score"), progress=job.progress)]
+    pairs.sort(key=lambda pair: pair["score"], reverse=True)
+    return {"count": len(pairs), "pairs": pairs[:JOB_MAX_PAIRS], "truncated": len(pairs) > JOB_MAX_PAIRS}
+
+
+register_job("dedup", _dedup_job, max_attempts=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-score", type=float, default=settings.DEDUP_MIN_SCORE)
+    parser.add_argument("--workers", type=int, default=settings.DEDUP_WORKERS)
+    args = parser.parse_args()
+
+    async def main_async():
+        count = 0
+        try:
+            async for pair in find_duplicates(args.min_score, args.workers):
+                sys.stdout.buffer.write(dumps(pair) + b"\n")
+                count += 1
+        finally:
+            await engine.dispose()
+        print(f"[DEDUP] {count} candidate pairs", file=sys.stderr)
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Era and category dictionaries with published person counts.
+
+Person records carry only era_code / category_code; clients resolve them with
+these lists, which are small and sent once (/api/dictionaries,
+/api/timeline/eras). Counts group on the indexed integer codes.
+"""
+from sqlalchemy import func, select
+
+from app.models.dictionary import Category, Era
+from app.models.person import Person
+
+
+def _published_counts(code_column):
+    return (
+        select(code_column.label("code"), func.count().label("count"))
+        .where(Person.is_published == True, code_column.isnot(None))
+        .group_by(code_column)
+        .subquery()
+    )
+
+
+async def load_eras(db) -> list[dict]:
+    """Eras in timeline order with published person counts; db is a session or connection."""
+    counts = _published_counts(Person.era_code)
+    rows = (await db.execute(
+        select(Era.code, Era.name, Era.start_year, Era.end_year, Era.color, func.coalesce(counts.c.count, 0))
+        .outerjoin(counts, counts.c.code == Era.code)
+        .order_by(Era.start_year, Era.code)
+    )).all()
+    return [
+        {"code": code, "name": name, "start_year": start, "end_year": end, "color": color, "count": count}
+        for code, name, start, end, color, count in rows
+    ]
+
+
+async def load_categories(db) -> list[dict]:
+    counts = _published_counts(Person.category_code)
+    rows = (await db.execute(
+        select(Category.code, Category.slug, Category.label, func.coalesce(counts.c.count, 0))
+        .outerjoin(counts, counts.c.code == Category.code)
+        .order_by(Category.code)
+    )).all()
+    return [{"code": code, "slug": slug, "label": label, "count": count} for code, slug, label, count in rows]
+
+
+async def load_dictionaries(db) -> dict:
+    return {"eras": await load_eras(db), "categories": await load_categories(db)}
@@ -0,0 +1,312 @@
+"""Offline geocoding of place names against a local GeoNames gazetteer.
+
+GAZETTEER_PATH points at a GeoNames dump in its tab-separated format
+(cities15000.txt, cities500.txt, or an extract of allCountries.txt), loaded
+once per process into:
+
+  * a name index: every name, ASCII name and alternate name (GeoNames keeps
+    the Russian, Greek, Latin, ... spellings there), case-folded and stripped
+    of accents, mapped to its places, most populous first;
+  * numpy coordinate arrays, for ranking same-named places by distance to
+    another known location of the person.
+
+"Александрия, Египет" resolves the first part and prefers places in the
+countries the remaining parts resolve to. Results are memoized per process,
+and resolved coordinates are written into the row, so a place is looked up
+once. Coordinates typed in by hand are never overwritten.
+
+Usage:
+    python -m app.services.geocoder "Афины, Греция" "Мемфис"
+    python -m app.services.geocoder --backfill [--dry-run]
+"""
+import argparse
+import asyncio
+import math
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import Float, Uuid, cast, column, func, or_, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session, engine
+from app.models.person import Person
+from app.services.change_feed import publish_change
+from app.services.jobs import JobContext, register_job
+
+EARTH_RADIUS_KM = 6371.0
+SIDES = ("birth", "death")
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_place(name: str) -> str:
+    text = unicodedata.normalize("NFKD", name.casefold().replace("ё", "е"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _chord_to_km(chord_squared: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    lat: float
+    lon: float
+    country: str
+    population: int
+    distance_km: float | None = None
+
+
+class Gazetteer:
+    def __init__(self, names: list[str], lat, lon, population, country: list[str], index: dict[str, tuple]):
+        self.names = names
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.population = np.asarray(population, dtype=np.int64)
+        self.country = country
+        self.index = index
+
+    @classmethod
+    def load(cls, path: Path, feature_classes: str = "PALT") -> "Gazetteer":
+        names, lat, lon, population, country = [], [], [], [], []
+        postings: dict[str, list[int]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 15 or fields[6] not in feature_classes:
+                    continue
+                i = len(names)
+                names.append(fields[1])
+                lat.append(float(fields[4]))
+                lon.append(float(fields[5]))
+                population.append(int(fields[14] or 0))
+                country.append(fields[8])
+                keys = {fields[1], fields[2], *fields[3].split(",")}
+                for key in {normalize_place(k) for k in keys if k}:
+                    if key:
+                        postings.setdefault(key, []).append(i)
+        index = {
+            key: tuple(sorted(ids, key=lambda i: -population[i]))
+            for key, ids in postings.items()
+        }
+        return cls(names, lat, lon, population, country, index)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _place(self, i: int, distance_km: float | None = None) -> Place:
+        return Place(
+            self.names[i], float(self.lat[i]), float(self.lon[i]), self.country[i], int(self.population[i]),
+            None if distance_km is None else round(distance_km, 1),
+        )
+
+    def candidates(self, name: str) -> tuple:
+        return self.index.get(normalize_place(name), ())
+
+    def resolve(self, place_name: str, near: tuple[float, float] | None = None) -> Place | None:
+        """Coordinates for a free-text place name such as "Мемфис, Египет"."""
+        parts = [p.strip() for p in place_name.split(",") if p.strip()]
+        if not parts:
+            return None
+        found = self.candidates(place_name)
+        qualifiers = []
+        if not found:
+            found = self.candidates(parts[0])
+            qualifiers = parts[1:]
+        if not found:
+            return None
+
+        countries = {self.country[ids[0]] for ids in map(self.candidates, qualifiers) if ids}
+        ids = np.array(found)
+        # np.lexsort sorts by the last key first; candidates are already most populous first.
+        keys = [np.arange(len(ids))]
+        distances = None
+        if near is not None:
+            target = _unit_vectors(np.array([near[0]]), np.array([near[1]]))
+            distances = ((_unit_vectors(self.lat[ids], self.lon[ids]) - target) ** 2).sum(axis=1)
+            keys.append(distances)
+        if countries:
+            keys.append(np.array([self.country[i] not in countries for i in found]))
+        best = int(np.lexsort(keys)[0])
+        return self._place(int(ids[best]), None if distances is None else _chord_to_km(float(distances[best])))
+
+
+_gazetteer: Gazetteer | None = None
+_load_lock = asyncio.Lock()
+
+
+def gazetteer_available() -> bool:
+    return bool(settings.GAZETTEER_PATH) and settings.GAZETTEER_PATH.is_file()
+
+
+async def get_gazetteer() -> Gazetteer | None:
+    """The process-wide gazetteer, loaded in a thread on first use; None without a file."""
+    global _gazetteer
+    if _gazetteer is None and gazetteer_available():
+        async with _load_lock:
+            if _gazetteer is None:
+                started = time.perf_counter()
+                _gazetteer = await asyncio.to_thread(
+                    Gazetteer.load, settings.GAZETTEER_PATH, settings.GAZETTEER_FEATURE_CLASSES,
+                )
+                _resolve_cached.cache_clear()
+                print(
+                    f"[GEOCODER] Loaded {len(_gazetteer)} places, {len(_gazetteer.index)} names "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+                )
+    return _gazetteer
+
+
+@lru_cache(maxsize=settings.GEOCODE_CACHE_SIZE)
+def _resolve_cached(place_name: str, near: tuple[float, float] | None) -> Place | None:
+    return _gazetteer.resolve(place_name, near)
+
+
+def resolve(place_name: str, near: tuple[float, float] | None = None) -> Place | None:
+    """Memoized `Gazetteer.resolve`; the hint is rounded so nearby hints share entries."""
+    if _gazetteer is None or not place_name:
+        return None
+    if near is not None:
+        near = (round(near[0], 1), round(near[1], 1))
+    return _resolve_cached(place_name.strip(), near)
+
+
+def missing_coordinates(row) -> dict[str, float]:
+    """Coordinates resolvable for a person (ORM object or row) whose place name has none."""
+    filled = {}
+    for side, other in (SIDES, SIDES[::-1]):
+        place_name = getattr(row, f"{side}_place_name")
+        if not place_name or getattr(row, f"{side}_lat") is not None:
+            continue
+        other_lat, other_lon = getattr(row, f"{other}_lat"), getattr(row, f"{other}_lon")
+        near = (other_lat, other_lon) if other_lat is not None and other_lon is not None else None
+        place = resolve(place_name, near)
+        if place is not None:
+            filled[f"{side}_lat"] = place.lat
+            filled[f"{side}_lon"] = place.lon
+    return filled
+
+
+async def geocode_person(person: Person) -> dict[str, float]:
+    """Fill missing coordinates of `person` in place from its place names."""
+    if not settings.GEOCODE_ON_SAVE or await get_gazetteer() is None:
+        return {}
+    filled = missing_coordinates(person)
+    for key, value in filled.items():
+        setattr(person, key, value)
+    return filled
+
+
+async def backfill(
+    db: AsyncSession, dry_run: bool = False, chunk_size: int = 5000,
+    progress: Callable[[float, str], None] | None = None,
+) -> dict:
+    """Geocode every person with a place name but no coordinates, as set-based updates.
+
+    `progress(fraction, message)` is called after the lookups and after each chunk.
+    """
+    if await get_gazetteer() is None:
+        raise RuntimeError(f"Gazetteer file not found: {settings.GAZETTEER_PATH}")
+    started = time.perf_counter()
+    rows = (await db.execute(
+        select(
+            Person.id, Person.birth_place_name, Person.death_place_name,
+            Person.birth_lat, Person.birth_lon, Person.death_lat, Person.death_lon,
+        ).where(or_(
+            Person.birth_place_name.isnot(None) & Person.birth_lat.is_(None),
+            Person.death_place_name.isnot(None) & Person.death_lat.is_(None),
+        ))
+    )).all()
+    resolved = await asyncio.to_thread(lambda: [(row.id, missing_coordinates(row)) for row in rows])
+    resolved = [(person_id, filled) for person_id, filled in resolved if filled]
+    if progress:
+        progress(0.5, f"resolved {len(resolved)} of {len(rows)}")
+
+    updated = 0
+    if not dry_run:
+        for start in range(0, len(resolved), chunk_size):
+            chunk = resolved[start:start + chunk_size]
+            new = values(
+                column("id", Uuid), *(column(f"{side}_{axis}", Float) for side in SIDES for axis in ("lat", "lon")),
+                name="geocoded",
+            ).data([
+                (person_id, *(filled.get(f"{side}_{axis}") for side in SIDES for axis in ("lat", "lon")))
+                for person_id, filled in chunk
+            ])
+            # COALESCE keeps coordinates entered while the backfill was running; the cast
+            # types VALUES columns whose first row is NULL, which Postgres reads as text.
+            result = await db.execute(
+                update(Person)
+                .where(Person.id == new.c.id)
+                .values({
+                    getattr(Person, name): func.coalesce(getattr(Person, name), cast(new.c[name], Float))
+                    for name in (f"{side}_{axis}" for side in SIDES for axis in ("lat", "lon"))
+                })
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+            if progress:
+                progress(0.5 + 0.5 * (start + len(chunk)) / len(resolved), f"updated {updated}")
+        if updated:
+            await publish_change(db, "persons", None, "update")
+
+    return {
+        "candidates": len(rows),
+        "resolved": len(resolved),
+        "updated": updated,
+        "dry_run": dry_run,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _backfill_job(job: JobContext) -> dict:
+    async with async_session() as db:
+        result = await backfill(db, dry_run=bool(job.payload.get("dry_run")), progress=job.progress)
+        await db.commit()
+    return result
+
+
+register_job("geocode_backfill", _backfill_job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("places", nargs="*", help="place names to look up")
+    parser.add_argument("--backfill", action="store_true", help="fill missing person coordinates")
+    parser.add_argument("--dry-run", action="store_true", help="with --backfill: count without writing")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            if await get_gazetteer() is None:
+                raise SystemExit(f"[GEOCODER] Gazetteer file not found: {settings.GAZETTEER_PATH}")
+            for name in args.places:
+                place = resolve(name)
+                print(f"{name}\t{place.lat}\t{place.lon}\t{place.name}, {place.country}" if place else f"{name}\t-")
+            if args.backfill:
+                async with async_session() as db:
+                    result = await backfill(db, dry_run=args.dry_run)
+                    await db.commit()
+                print(f"[GEOCODER] Backfill: {result}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Resized variants of uploaded images, rendered on demand and cached on disk.
+
+Variants are rendered with Pillow in a process pool (decoding a multi-megapixel
+original is CPU-bound and would stall the event loop or, in a thread, the GIL)
+and stored under IMAGE_CACHE_DIR keyed by source path, source mtime, size and
+fit mode, so a replaced original never serves an old variant. The directory is
+bounded by IMAGE_CACHE_MAX_BYTES with least-recently-used eviction; recency is
+kept in file mtimes, so it survives restarts and is shared by all workers.
+Each worker only sees its own renders, so after writing a sixteenth of the
+limit it rescans the whole directory under a file lock and evicts for
+everyone; N workers overshoot the limit by at most N/16 of it.
+Concurrent requests for the same variant wait on a single render.
+"""
+import asyncio
+import fcntl
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.jobs import JobContext, register_job
+
+MEDIA_TYPE = "image/webp"
+EVICTION_LOCK = ".lock"
+# Share of IMAGE_CACHE_MAX_BYTES a worker may write before it rescans the shared directory.
+RESCAN_FRACTION = 1 / 16
+
+
+class ImageError(Exception):
+    pass
+
+
+def render_variant(source: str, target: str, width: int, height: int, fit: str, quality: int):
+    """Runs in a worker process: decode `source`, resize and write WebP to `target`."""
+    Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_SOURCE_PIXELS
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with Image.open(source) as img:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than full size.
+        img.draft("RGB", (width * 2, height * 2))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+        if fit == "cover":
+            img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+        else:
+            img.thumbnail((width, height), Image.LANCZOS)
+        try:
+            img.save(tmp, "WEBP", quality=quality, method=4)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    os.replace(tmp, target)
+
+
+class ImageCache:
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._written = 0
+        self._evicting = False
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.renders = 0
+        self.render_ms = 0.0
+
+    def source_path(self, relative: str) -> Path:
+        """Resolve a path under UPLOAD_DIR, refusing anything that escapes it."""
+        root = settings.UPLOAD_DIR.resolve()
+        path = (root / relative).resolve()
+        if not path.is_relative_to(root) or path.suffix.lower() not in settings.ALLOWED_EXTENSIONS:
+            raise FileNotFoundError(relative)
+        if not path.is_file():
+            raise FileNotFoundError(relative)
+        return path
+
+    def _key(self, source: Path, width: int, height: int, fit: str) -> str:
+        stat = source.stat()
+        raw = f"{source}:{stat.st_mtime_ns}:{width}x{height}:{fit}:{settings.IMAGE_QUALITY}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.webp"
+
+    def _scan(self) -> OrderedDict[str, int]:
+        """Key -> size of every variant on disk, written by any worker, oldest mtime first."""
+        entries = []
+        if self.directory.exists():
+            for path in self.directory.glob("*/*.webp"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        return OrderedDict((key, size) for _, key, size in entries)
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files on disk."""
+        self._files = self._scan()
+        self._bytes = sum(self._files.values())
+        self._loaded = True
+
+    def _evict_shared(self) -> tuple[OrderedDict[str, int], int]:
+        """Run in a thread: under the directory lock, rescan the files of all workers and delete
+        the least recently used until they fit in max_bytes. Returns the new index and the count."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / EVICTION_LOCK, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            files = self._scan()
+            total = sum(files.values())
+            evicted = 0
+            while total > self.max_bytes and len(files) > 1:
+                key, size = files.popitem(last=False)
+                total -= size
+                evicted += 1
+                self._path(key).unlink(missing_ok=True)
+        return files, evicted
+
+    def _lookup(self, relative: str, width: int, height: int, fit: str) -> tuple[Path, str, int | None]:
+        """Filesystem half of get(), run in a thread: the source, the variant key and, if the
+        variant is on disk, its size (its mtime is bumped to mark it recently used)."""
+        source = self.source_path(relative)
+        key = self._key(source, width, height, fit)
+        path = self._path(key)
+        try:
+            os.utime(path)
+            return source, key, path.stat().st_size
+        except FileNotFoundError:
+            return source, key, None
+
+    def _add(self, key: str, size: int) -> bool:
+        """Record a new variant as most recently used; True when the directory is due for eviction."""
+        self._bytes += size - self._files.pop(key, 0)
+        self._files[key] = size
+        self._written += size
+        return self._bytes > self.max_bytes or self._written >= self.max_bytes * RESCAN_FRACTION
+
+    async def _evict(self):
+        if self._evicting:
+            return
+        self._evicting = True
+        self._written = 0
+        try:
+            files, evicted = await asyncio.to_thread(self._evict_shared)
+        finally:
+            self._evicting = False
+        self._files, self._bytes = files, sum(files.values())
+        self.evictions += evicted
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+        return self._pool
+
+    async def _render(self, key: str, source: Path, width: int, height: int, fit: str) -> Path:
+        path = self._path(key)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor(), render_variant, str(source), str(path), width, height, fit, settings.IMAGE_QUALITY,
+            )
+        except BrokenProcessPool as e:
+            # A worker died (out of memory on a huge original); start a fresh pool next time.
+            self._pool = None
+            raise ImageError(f"Cannot render {source.name}: worker pool crashed") from e
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ImageError(f"Cannot render {source.name}: {e}") from e
+        self.renders += 1
+        self.render_ms += (time.perf_counter() - started) * 1000
+        size = (await asyncio.to_thread(path.stat)).st_size
+        if self._add(key, size):
+            await self._evict()
+        return path
+
+    async def get(self, relative: str, width: int, height: int, fit: str = "cover") -> Path:
+        """Path of the cached variant, rendering it first if needed."""
+        if not self._loaded:
+            await asyncio.to_thread(self._load_index)
+        source, key, size = await asyncio.to_thread(self._lookup, relative, width, height, fit)
+        if size is not None:
+            # Rendered here or by another worker; either way now the most recently used.
+            self._bytes += size - self._files.pop(key, 0)
+            self._files[key] = size
+            self.hits += 1
+            return self._path(key)
+        # Never rendered, or evicted by another worker.
+        self._bytes -= self._files.pop(key, 0)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._render(key, source, width, height, fit))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "files": len(self._files),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "renders": self.renders,
+            "avg_render_ms": round(self.render_ms / self.renders, 1) if self.renders else None,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+image_cache = ImageCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES)
+
+
+async def _prerender_job(job: JobContext) -> dict:
+    """Render an upload's common variants ahead of the first page that shows it."""
+    sizes = [tuple(size) for size in job.payload.get("sizes", settings.IMAGE_PRERENDER_SIZES)]
+    rendered = 0
+    for i, (width, height) in enumerate(sizes):
+        try:
+            await image_cache.get(job.payload["path"], width, height)
+        except FileNotFoundError:
+            # Deleted since the upload; nothing to retry.
+            return {"rendered": rendered, "missing": True}
+        rendered += 1
+        job.progress((i + 1) / len(sizes), f"{width}x{height}")
+    return {"rendered": rendered}
+
+
+# A source Pillow cannot decode won't decode on a retry either.
+register_job("image_variants", _prerender_job, concurrency=settings.IMAGE_WORKERS, max_attempts=1)
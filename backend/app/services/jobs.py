@@ -0,0 +1,355 @@
+"""Background jobs for long admin work, queued in Postgres.
+
+Admin endpoints insert a row into `jobs` (init-db/11) and answer 202 at once.
+Worker tasks claim due rows with SELECT ... FOR UPDATE SKIP LOCKED, so every
+backend process, and the standalone runner below, share one queue without
+running a job twice. Claims and status writes are short transactions of their
+own: no request worker and no connection is held while a handler runs.
+
+While a handler runs, a heartbeat writes its progress to the row every
+JOB_HEARTBEAT_SECONDS and picks up cancel requests. A running job whose
+heartbeat is older than JOB_STALE_SECONDS (its process died) is returned to
+the queue. Failed attempts are retried up to max_attempts with exponential
+backoff from JOB_RETRY_BASE_SECONDS.
+
+The modules that own the work register their job kinds:
+
+    register_job("snapshot_export", run_export, concurrency=1)
+
+Usage:
+    python -m app.services.jobs              # workers without the web app (set JOB_WORKERS=0 there)
+    python -m app.services.jobs --workers 4
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import case, delete, event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session, engine
+from app.models.job import Job
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Imported by the standalone runner: each registers its job kinds on import.
+HANDLER_MODULES = ("app.services.snapshot", "app.services.geocoder", "app.services.dedup", "app.services.images")
+
+
+class JobContext:
+    """What a handler sees of its job: payload, attempt number and a progress reporter."""
+
+    def __init__(self, job_id: int, kind: str, payload: dict, attempt: int, max_attempts: int):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempt = attempt
+        self.max_attempts = max_attempts
+        self.done = 0.0
+        self.message: str | None = None
+        self.cancel_requested = False
+
+    def progress(self, done: float, message: str | None = None):
+        """Record progress in [0, 1]; it reaches the row with the next heartbeat."""
+        self.done = min(1.0, max(0.0, done))
+        if message is not None:
+            self.message = message
+
+
+@dataclass
+class JobHandler:
+    fn: Callable[[JobContext], Awaitable[Any]]
+    # Jobs of this kind running at once in one process.
+    concurrency: int
+    max_attempts: int
+
+
+_handlers: dict[str, JobHandler] = {}
+
+
+def register_job(
+    kind: str, fn: Callable[[JobContext], Awaitable[Any]], *, concurrency: int = 1, max_attempts: int | None = None,
+):
+    """fn(job) runs the job and returns a JSON-serializable result; raising fails the attempt."""
+    _handlers[kind] = JobHandler(fn, concurrency, max_attempts or settings.JOB_MAX_ATTEMPTS)
+
+
+def job_kinds() -> list[str]:
+    return sorted(_handlers)
+
+
+async def enqueue(
+    db: AsyncSession, kind: str, payload: dict | None = None, *,
+    max_attempts: int | None = None, unique: bool = False, delay_seconds: float = 0,
+) -> Job:
+    """Queue a job in the caller's transaction; workers see it once that commits.
+
+    With `unique`, an identical job that is still queued is returned instead of a
+    new one; concurrent unique enqueues of a kind (every worker reacting to one
+    change) are serialized until commit, so only the first inserts. `delay_seconds`
+    holds the job back, letting unique enqueues during that time coalesce into it.
+    """
+    handler = _handlers.get(kind)
+    if handler is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+    payload = payload or {}
+    if unique:
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"jobs:{kind}"))))
+        existing = (await db.execute(
+            select(Job).where(Job.kind == kind, Job.payload == payload, Job.status == "queued")
+            .order_by(Job.id).limit(1)
+        )).scalar_one_or_none()
+        if existing is not None:
+            return existing
+    job = (await db.execute(
+        insert(Job).values(
+            kind=kind, payload=payload, max_attempts=max_attempts or handler.max_attempts,
+            run_after=func.now() + timedelta(seconds=delay_seconds),
+        ).returning(Job)
+    )).scalar_one()
+    # Workers of this process start it right after the commit instead of at the next poll.
+    event.listen(db.sync_session, "after_commit", lambda _session: job_runner.wake(), once=True)
+    return job
+
+
+async def request_cancel(db: AsyncSession, job_id: int) -> Job | None:
+    """Cancel a queued job now, or ask the worker running it to stop at its next heartbeat."""
+    job = await db.get(Job, job_id, with_for_update=True)
+    if job is None:
+        return None
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = func.now()
+    elif job.status == "running":
+        job.cancel_requested = True
+    await db.flush()
+    await db.refresh(job)
+    return job
+
+
+class JobRunner:
+    def __init__(self):
+        self.concurrency = 0
+        self._running: dict[int, asyncio.Task] = {}
+        self._busy: dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self.claimed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def wake(self):
+        self._wake.set()
+
+    async def _claim(self) -> JobContext | None:
+        kinds = [kind for kind, handler in _handlers.items() if self._busy.get(kind, 0) < handler.concurrency]
+        if not kinds:
+            return None
+        due = (
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_after <= func.now(), Job.kind.in_(kinds))
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with async_session() as session:
+            row = (await session.execute(
+                update(Job)
+                .where(Job.id == due)
+                .values(
+                    status="running", attempts=Job.attempts + 1, worker=WORKER_ID,
+                    started_at=func.now(), heartbeat_at=func.now(), progress=0, message=None,
+                )
+                .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+            )).first()
+            await session.commit()
+        if row is None:
+            return None
+        self.claimed += 1
+        return JobContext(*row)
+
+    async def _update(self, job: JobContext, **values) -> bool | None:
+        """Write to the job's row unless it has been taken away; returns its cancel flag, None if gone."""
+        async with async_session() as session:
+            cancel = (await session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == "running", Job.attempts == job.attempt)
+                .values(**values)
+                .returning(Job.cancel_requested)
+            )).scalar_one_or_none()
+            await session.commit()
+        return cancel
+
+    async def _heartbeat(self, job: JobContext, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                cancel = await self._update(job, heartbeat_at=func.now(), progress=job.done, message=job.message)
+            except Exception as e:
+                print(f"[JOBS] Heartbeat of job {job.id} failed: {e}")
+                continue
+            # None: the reaper gave the job to another worker, so this attempt must stop too.
+            if cancel is None or cancel:
+                job.cancel_requested = True
+                task.cancel()
+                return
+
+    async def _run(self, job: JobContext):
+        heartbeat = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        started = time.perf_counter()
+        try:
+            result = await _handlers[job.kind].fn(job)
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            if not job.cancel_requested:
+                # Shutdown: hand the job back without spending an attempt.
+                await self._update(job, status="queued", attempts=Job.attempts - 1, worker=None, run_after=func.now())
+                raise
+            await self._update(job, status="cancelled", finished_at=func.now(), progress=job.done, message=job.message)
+            print(f"[JOBS] Job {job.id} ({job.kind}) cancelled")
+        except Exception as e:
+            heartbeat.cancel()
+            error = f"{type(e).__name__}: {e}"
+            if job.attempt < job.max_attempts:
+                delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempt - 1))
+                await self._update(
+                    job, status="queued", error=error, worker=None,
+                    run_after=func.now() + timedelta(seconds=delay),
+                )
+                self.retried += 1
+                print(f"[JOBS] Job {job.id} ({job.kind}) attempt {job.attempt} failed, retry in {delay:.0f}s: {error}")
+            else:
+                await self._update(job, status="failed", error=error, finished_at=func.now())
+                self.failed += 1
+                print(f"[JOBS] Job {job.id} ({job.kind}) failed after {job.attempt} attempts: {error}")
+        else:
+            heartbeat.cancel()
+            await self._update(
+                job, status="succeeded", result=result, error=None, progress=1.0, message=job.message,
+                finished_at=func.now(),
+            )
+            self.succeeded += 1
+            print(f"[JOBS] Job {job.id} ({job.kind}) done in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _start(self, job: JobContext):
+        self._busy[job.kind] = self._busy.get(job.kind, 0) + 1
+        task = asyncio.create_task(self._run(job))
+        self._running[job.id] = task
+
+        def finished(_task):
+            self._running.pop(job.id, None)
+            self._busy[job.kind] -= 1
+            self.wake()
+
+        task.add_done_callback(finished)
+
+    async def _reap(self):
+        """Requeue jobs whose worker stopped sending heartbeats; drop old finished jobs."""
+        exhausted = Job.attempts >= Job.max_attempts
+        async with async_session() as session:
+            stale = (await session.execute(
+                update(Job)
+                .where(
+                    Job.status == "running",
+                    Job.heartbeat_at < func.now() - timedelta(seconds=settings.JOB_STALE_SECONDS),
+                )
+                .values(
+                    status=case((Job.cancel_requested, "cancelled"), (exhausted, "failed"), else_="queued"),
+                    finished_at=case((Job.cancel_requested | exhausted, func.now()), else_=None),
+                    error="Worker stopped responding", worker=None, run_after=func.now(),
+                )
+                .returning(Job.id)
+            )).scalars().all()
+            await session.execute(
+                delete(Job).where(Job.finished_at < func.now() - timedelta(days=settings.JOB_RETENTION_DAYS))
+            )
+            await session.commit()
+        if stale:
+            print(f"[JOBS] Requeued {len(stale)} jobs of unresponsive workers: {stale}")
+
+    async def run_forever(self, concurrency: int):
+        self.concurrency = concurrency
+        print(f"[JOBS] Worker {WORKER_ID} running up to {concurrency} jobs")
+        last_reap = 0.0
+        try:
+            while True:
+                self._wake.clear()
+                try:
+                    if time.monotonic() - last_reap >= settings.JOB_STALE_SECONDS / 4:
+                        await self._reap()
+                        last_reap = time.monotonic()
+                    while len(self._running) < self.concurrency:
+                        job = await self._claim()
+                        if job is None:
+                            break
+                        self._start(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"[JOBS] Queue poll failed: {e}")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            running = list(self._running.values())
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "worker": WORKER_ID,
+            "concurrency": self.concurrency,
+            "running": sorted(self._running),
+            "kinds": job_kinds(),
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+job_runner = JobRunner()
+
+
+def start_job_workers() -> list[asyncio.Task]:
+    if settings.JOB_WORKERS <= 0:
+        return []
+    return [asyncio.create_task(job_runner.run_forever(settings.JOB_WORKERS))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(1, settings.JOB_WORKERS), help="jobs run at once")
+    args = parser.parse_args()
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+    async def main_async():
+        task = asyncio.create_task(job_runner.run_forever(args.workers))
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    # Run from the imported module: handler modules register into its registry, not __main__'s.
+    from app.services.jobs import main as imported_main
+    imported_main()
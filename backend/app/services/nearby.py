@@ -0,0 +1,230 @@
+"""In-memory index of published birthplaces for "born near here" queries.
+
+Map records of published persons with coordinates are bucketed into a grid of
+NEARBY_CELL_DEGREES cells. A query visits only the cells overlapping the
+search circle's bounding box (widened towards the poles, wrapping at the
+antimeridian) and refines their points with one vectorized haversine per
+cell; each cell keeps numpy arrays of its points, rebuilt only when the cell
+changes.
+
+The change feed keeps the index current: single-person changes re-read that
+one row, anything broader (bulk operations, missed notifications) reloads
+the whole index on the next query.
+"""
+import asyncio
+import math
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session
+from app.models.dataset_version import DatasetVersion
+from app.models.person import Person
+from app.services.change_feed import Change, local_version, register_caching_switch, register_invalidator
+from app.services.readiness import register_warmup
+from app.services.serialization import MAP_FIELDS, person_columns, rows_to_dicts
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class _Cell:
+    __slots__ = ("ids", "arrays")
+
+    def __init__(self):
+        self.ids: set[str] = set()
+        # (ids, lat, lon, birth_year, death_year) as arrays; None until the next query after a change.
+        self.arrays: tuple | None = None
+
+
+class BirthplaceIndex:
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.lon_cells = math.ceil(360 / cell_degrees)
+        self.records: dict[str, dict] = {}
+        self._cells: dict[tuple[int, int], _Cell] = {}
+        self._lock = asyncio.Lock()
+        self.stale = True
+        # False while the change feed cannot vouch for local state; see ensure_loaded().
+        self.trusted = False
+        self.loaded_at = 0.0
+        # Dataset version read just before the rows of the last rebuild.
+        self.version: int | None = None
+        self.rebuilds = 0
+        self.updates = 0
+        self.queries = 0
+        self.query_ms = 0.0
+
+    def _cell_key(self, lat: float, lon: float) -> tuple[int, int]:
+        row = math.floor((min(lat, 90 - 1e-9) + 90) / self.cell_degrees)
+        col = math.floor((lon + 180) / self.cell_degrees) % self.lon_cells
+        return row, col
+
+    def _add(self, record: dict):
+        person_id = record["id"]
+        self.records[person_id] = record
+        cell = self._cells.setdefault(self._cell_key(record["birth_lat"], record["birth_lon"]), _Cell())
+        cell.ids.add(person_id)
+        cell.arrays = None
+
+    def _remove(self, person_id: str):
+        record = self.records.pop(person_id, None)
+        if record is None:
+            return
+        key = self._cell_key(record["birth_lat"], record["birth_lon"])
+        cell = self._cells[key]
+        cell.ids.discard(person_id)
+        cell.arrays = None
+        if not cell.ids:
+            del self._cells[key]
+
+    def _arrays(self, cell: _Cell) -> tuple:
+        if cell.arrays is None:
+            records = [self.records[person_id] for person_id in cell.ids]
+            cell.arrays = (
+                [r["id"] for r in records],
+                np.radians(np.array([r["birth_lat"] for r in records], dtype=np.float64)),
+                np.radians(np.array([r["birth_lon"] for r in records], dtype=np.float64)),
+                np.array([r["birth_year"] for r in records], dtype=np.int32),
+                np.array([r["death_year"] for r in records], dtype=np.int32),
+            )
+        return cell.arrays
+
+    @staticmethod
+    def _published_query():
+        return select(*person_columns(MAP_FIELDS)).where(
+            Person.is_published == True,
+            Person.birth_lat.isnot(None),
+            Person.birth_lon.isnot(None),
+        )
+
+    async def ensure_loaded(self):
+        """Rebuild from the database if stale, or if untrusted and older than the poll interval."""
+        if not self.stale and (self.trusted or time.monotonic() - self.loaded_at < settings.CHANGE_POLL_INTERVAL_SECONDS):
+            return
+        async with self._lock:
+            if not self.stale and (self.trusted or time.monotonic() - self.loaded_at < settings.CHANGE_POLL_INTERVAL_SECONDS):
+                return
+            started = time.perf_counter()
+            # Cleared before the read: a change notified during the load marks it stale again.
+            self.stale = False
+            async with async_session() as session:
+                version = (await session.execute(
+                    select(DatasetVersion.version).where(DatasetVersion.id == 1)
+                )).scalar_one_or_none()
+                rows = (await session.execute(self._published_query())).all()
+            self.version = version
+            if version is not None and version == local_version():
+                # Invalidations that arrived during the load are already in these rows.
+                self.stale = False
+            self.records = {}
+            self._cells = {}
+            for record in rows_to_dicts(rows, MAP_FIELDS):
+                self._add(record)
+            self.loaded_at = time.monotonic()
+            self.rebuilds += 1
+            print(
+                f"[NEARBY] Indexed {len(self.records)} birthplaces in {len(self._cells)} cells "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+
+    async def refresh(self, person_id: str):
+        """Re-read one person and update, add or drop its entry."""
+        async with self._lock:
+            if self.stale:
+                return
+            async with async_session() as session:
+                row = (await session.execute(
+                    self._published_query().where(Person.id == person_id)
+                )).first()
+            self._remove(person_id)
+            if row is not None:
+                self._add(rows_to_dicts([row], MAP_FIELDS)[0])
+            self.updates += 1
+
+    def query(
+        self, lat: float, lon: float, radius_km: float,
+        year_from: int | None = None, year_to: int | None = None, limit: int = 100,
+    ) -> list[dict]:
+        """Persons born within `radius_km` of a point, nearest first, with `distance_km`.
+
+        With a period, only persons whose lifespan overlaps [year_from, year_to].
+        """
+        started = time.perf_counter()
+        lat_span = radius_km / KM_PER_DEGREE
+        lat_lo, lat_hi = max(-90.0, lat - lat_span), min(90.0, lat + lat_span)
+        # Longitude degrees shrink with latitude; near a pole the box covers every longitude.
+        widest = max(abs(lat_lo), abs(lat_hi))
+        if widest >= 89.9 or lat_span / math.cos(math.radians(widest)) >= 180:
+            cols = range(self.lon_cells)
+        else:
+            lon_span = lat_span / math.cos(math.radians(widest))
+            first = math.floor((lon - lon_span + 180) / self.cell_degrees)
+            last = math.floor((lon + lon_span + 180) / self.cell_degrees)
+            cols = list(dict.fromkeys(c % self.lon_cells for c in range(first, last + 1)))
+        row_lo, _ = self._cell_key(lat_lo, lon)
+        row_hi, _ = self._cell_key(lat_hi, lon)
+
+        qlat, qlon = math.radians(lat), math.radians(lon)
+        ids, distances = [], []
+        for row in range(row_lo, row_hi + 1):
+            for col in cols:
+                cell = self._cells.get((row, col))
+                if cell is None:
+                    continue
+                cell_ids, plat, plon, births, deaths = self._arrays(cell)
+                a = np.sin((plat - qlat) / 2) ** 2 + math.cos(qlat) * np.cos(plat) * np.sin((plon - qlon) / 2) ** 2
+                d = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+                mask = d <= radius_km
+                if year_from is not None:
+                    mask &= deaths >= year_from
+                if year_to is not None:
+                    mask &= births <= year_to
+                for i in np.flatnonzero(mask):
+                    ids.append(cell_ids[i])
+                    distances.append(float(d[i]))
+
+        order = np.argsort(distances, kind="stable")[:limit] if distances else []
+        result = [{**self.records[ids[i]], "distance_km": round(distances[i], 1)} for i in order]
+        self.queries += 1
+        self.query_ms += (time.perf_counter() - started) * 1000
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "persons": len(self.records),
+            "cells": len(self._cells),
+            "stale": self.stale,
+            "trusted": self.trusted,
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+            "queries": self.queries,
+            "avg_query_ms": round(self.query_ms / self.queries, 3) if self.queries else None,
+        }
+
+
+birthplace_index = BirthplaceIndex(settings.NEARBY_CELL_DEGREES)
+
+
+def _on_change(change: Change | None):
+    if change is None:
+        # Unknown changes; nothing to redo if the last rebuild already read the feed's version (startup).
+        if birthplace_index.version != local_version():
+            birthplace_index.stale = True
+    elif change.entity == "persons" and change.entity_id is None:
+        birthplace_index.stale = True
+    else:
+        birthplace_index.version = change.version
+        if change.entity == "persons" and not birthplace_index.stale:
+            asyncio.get_running_loop().create_task(birthplace_index.refresh(change.entity_id))
+
+
+def _on_caching_switch(enabled: bool):
+    birthplace_index.trusted = enabled
+
+
+register_invalidator(_on_change)
+register_caching_switch(_on_caching_switch)
+register_warmup("nearby_index", birthplace_index.ensure_loaded)
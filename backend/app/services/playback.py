@@ -0,0 +1,55 @@
+"""Year-to-year diffs of the alive set for timeline playback.
+
+Between two years only the people born or dying in between change, so the
+stream sends the full alive set once and then per-step arrivals and
+departures, found by bisecting birth- and death-sorted arrays.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Iterator
+
+
+class LifespanIndex:
+    def __init__(self, records: list[dict]):
+        self.records = records
+        self._by_birth = sorted(range(len(records)), key=lambda i: records[i]["birth_year"])
+        self._births = [records[i]["birth_year"] for i in self._by_birth]
+        self._by_death = sorted(range(len(records)), key=lambda i: records[i]["death_year"])
+        self._deaths = [records[i]["death_year"] for i in self._by_death]
+
+    def _born_in(self, lo: int, hi: int) -> list[int]:
+        """Indices with lo < birth_year <= hi."""
+        return self._by_birth[bisect_right(self._births, lo):bisect_right(self._births, hi)]
+
+    def _died_in(self, lo: int, hi: int) -> list[int]:
+        """Indices with lo <= death_year < hi."""
+        return self._by_death[bisect_left(self._deaths, lo):bisect_left(self._deaths, hi)]
+
+    def alive(self, year: int) -> list[int]:
+        candidates = self._by_birth[:bisect_right(self._births, year)]
+        return [i for i in candidates if self.records[i]["death_year"] >= year]
+
+    def diff(self, year: int, next_year: int) -> tuple[list[int], list[int]]:
+        """(arrivals, departures) when moving the timeline from `year` to `next_year`."""
+        records = self.records
+        if next_year > year:
+            added = [i for i in self._born_in(year, next_year) if records[i]["death_year"] >= next_year]
+            removed = [i for i in self._died_in(year, next_year) if records[i]["birth_year"] <= year]
+        else:
+            added = [i for i in self._died_in(next_year, year) if records[i]["birth_year"] <= next_year]
+            removed = [i for i in self._born_in(next_year, year) if records[i]["death_year"] >= year]
+        return added, removed
+
+    def frames(self, start: int, step: int, count: int) -> Iterator[dict]:
+        records = self.records
+        yield {"type": "init", "year": start, "persons": [records[i] for i in self.alive(start)]}
+        year = start
+        for _ in range(count):
+            next_year = year + step
+            added, removed = self.diff(year, next_year)
+            yield {
+                "type": "step",
+                "year": next_year,
+                "added": [records[i] for i in added],
+                "removed": [records[i]["id"] for i in removed],
+            }
+            year = next_year
@@ -0,0 +1,145 @@
+"""Opt-in statement timing with a slow-query log and sampled EXPLAIN plans.
+
+Enabled with SLOW_QUERY_LOG=true. Every statement is timed through the
+before/after_cursor_execute engine events; statements slower than
+SLOW_QUERY_THRESHOLD_MS are printed together with their parameters and, for a
+sample of SELECTs, an EXPLAIN (ANALYZE, BUFFERS) plan. SELECTs that lock rows
+or call functions with side effects get a plain EXPLAIN instead: ANALYZE would
+run them a second time.
+"""
+import random
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+MAX_TRACKED_STATEMENTS = 1000
+MAX_PARAMS_REPR = 500
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:\$\d+(?:::\w+(?:\[\])?)?(?:, )?)+\)")
+_SIDE_EFFECTS = re.compile(
+    r"\bFOR (?:NO KEY )?UPDATE\b|\bFOR (?:KEY )?SHARE\b"
+    r"|\b(?:pg_notify|nextval|setval|pg_(?:try_)?advisory\w*)\s*\(",
+    re.IGNORECASE,
+)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and variable-length IN lists so equal queries share a key."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (...)", statement)
+
+
+class QueryStats:
+    """Cumulative per-statement timings, bounded to the most expensive statements."""
+
+    def __init__(self, max_statements: int = MAX_TRACKED_STATEMENTS):
+        self.max_statements = max_statements
+        self._stats: dict[str, dict] = {}
+
+    def record(self, statement: str, elapsed_ms: float, plan: list[str] | None = None):
+        entry = self._stats.get(statement)
+        if entry is None:
+            if len(self._stats) >= self.max_statements:
+                self._evict()
+            entry = self._stats[statement] = {
+                "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "slow_calls": 0, "last_plan": None,
+            }
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            entry["slow_calls"] += 1
+        if plan is not None:
+            entry["last_plan"] = plan
+
+    def _evict(self):
+        # Drop the cheapest half so a burst of one-off statements can't push out the hot ones.
+        ranked = sorted(self._stats.items(), key=lambda item: item[1]["total_ms"])
+        for statement, _ in ranked[: len(ranked) // 2]:
+            del self._stats[statement]
+
+    def top(self, limit: int) -> list[dict]:
+        ranked = sorted(self._stats.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return [
+            {
+                "statement": statement,
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_ms"], 3),
+                "mean_ms": round(entry["total_ms"] / entry["calls"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "slow_calls": entry["slow_calls"],
+                "last_plan": entry["last_plan"],
+            }
+            for statement, entry in ranked[:limit]
+        ]
+
+    def reset(self):
+        self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+def _explain(conn, statement: str, parameters, analyze: bool = True) -> list[str] | None:
+    """Run EXPLAIN (ANALYZE, BUFFERS), or plain EXPLAIN, on a separate cursor inside a savepoint.
+
+    The savepoint keeps a failing EXPLAIN from aborting the caller's transaction,
+    and the separate cursor keeps the original result set intact.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            prefix = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+            cursor.execute(f"{prefix} {statement}", parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            print(f"[SLOW QUERY] EXPLAIN failed: {e}")
+            return None
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        print(f"[SLOW QUERY] EXPLAIN failed: {e}")
+        return None
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start_time", None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    key = normalize_statement(statement)
+
+    plan = None
+    if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        params_repr = repr(parameters)
+        if len(params_repr) > MAX_PARAMS_REPR:
+            params_repr = params_repr[:MAX_PARAMS_REPR] + "..."
+        print(f"[SLOW QUERY] {elapsed_ms:.1f} ms: {key} | params: {params_repr}")
+
+        is_select = key.upper().startswith("SELECT")
+        if is_select and not executemany and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            plan = _explain(conn, statement, parameters, analyze=not _SIDE_EFFECTS.search(statement))
+            if plan:
+                print("[SLOW QUERY] plan:\n  " + "\n  ".join(plan))
+
+    query_stats.record(key, elapsed_ms, plan)
+
+
+def install_query_log(engine: Engine):
+    """Attach the timing hooks to a (sync) engine; safe to call once at import time."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
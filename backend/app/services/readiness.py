@@ -0,0 +1,69 @@
+"""Startup warm-up and readiness tracking.
+
+Modules register warm-up coroutines (connection pool, hot queries, caches);
+they run concurrently in the background once the app has started, and
+/api/ready answers 503 until all of them have finished.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+_warmups: list[tuple[str, Callable[[], Awaitable]]] = []
+_state = {"ready": False, "started_at": None, "finished_at": None, "tasks": {}}
+
+
+def register_warmup(name: str, fn: Callable[[], Awaitable]):
+    _warmups.append((name, fn))
+
+
+def is_ready() -> bool:
+    return _state["ready"]
+
+
+def readiness_status() -> dict:
+    return {
+        "ready": _state["ready"],
+        "tasks": dict(_state["tasks"]),
+        "warmup_ms": (
+            round((_state["finished_at"] - _state["started_at"]) * 1000, 1)
+            if _state["finished_at"] else None
+        ),
+    }
+
+
+async def _run(name: str, fn: Callable[[], Awaitable]):
+    started = time.perf_counter()
+    try:
+        await fn()
+        _state["tasks"][name] = f"ok ({(time.perf_counter() - started) * 1000:.0f} ms)"
+    except Exception as e:
+        # A failed warm-up only costs latency on the first requests; don't block readiness on it.
+        _state["tasks"][name] = f"failed: {e}"
+        print(f"[STARTUP ERROR] Warm-up '{name}' failed: {e}")
+
+
+async def warm_up():
+    _state["started_at"] = time.perf_counter()
+    _state["tasks"] = {name: "pending" for name, _ in _warmups}
+    await asyncio.gather(*(_run(name, fn) for name, fn in _warmups))
+    _state["finished_at"] = time.perf_counter()
+    _state["ready"] = True
+    print(f"[STARTUP] Ready after {(_state['finished_at'] - _state['started_at']) * 1000:.0f} ms")
+
+
+async def warm_connection_pool():
+    """Open WARMUP_POOL_CONNECTIONS connections at once so first requests don't pay for connect()."""
+
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(touch() for _ in range(settings.WARMUP_POOL_CONNECTIONS)))
+
+
+register_warmup("connection_pool", warm_connection_pool)
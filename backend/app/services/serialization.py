@@ -0,0 +1,74 @@
+"""Fast JSON path for public payloads built from trusted database rows.
+
+Public read endpoints return thousands of rows per request. Validating each row
+through a Pydantic response model costs more than the query itself, so these
+helpers copy only the fields a response model declares and hand plain dicts to
+orjson. List routes go further and select only those columns, getting plain
+row tuples instead of ORM entities. The response models stay on the routes for
+the OpenAPI schema.
+"""
+from typing import Any
+from uuid import UUID
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import String
+
+from app.models.person import Person
+from app.schemas import PersonMapResponse, PersonYearRangeResponse, PersonResponse, PhotoGalleryResponse
+
+
+def model_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+MAP_FIELDS = model_fields(PersonMapResponse)
+YEAR_RANGE_FIELDS = model_fields(PersonYearRangeResponse)
+PHOTO_FIELDS = model_fields(PhotoGalleryResponse)
+DETAIL_FIELDS = tuple(f for f in model_fields(PersonResponse) if f != "photos")
+
+
+def person_columns(fields: tuple[str, ...]) -> list:
+    """Columns for a projected select(); the id is cast to text so Postgres formats it."""
+    return [
+        Person.id.cast(String).label("id") if field == "id" else getattr(Person, field)
+        for field in fields
+    ]
+
+
+def rows_to_dicts(rows, fields: tuple[str, ...]) -> list[dict]:
+    """Core rows from a select(*person_columns(fields)) -> dicts keyed by field."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def to_dict(obj, fields: tuple[str, ...]) -> dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def to_dicts(objs, fields: tuple[str, ...]) -> list[dict]:
+    return [{field: getattr(obj, field) for field in fields} for obj in objs]
+
+
+def person_detail_dict(person) -> dict:
+    data = to_dict(person, DETAIL_FIELDS)
+    data["photos"] = to_dicts(person.photos, PHOTO_FIELDS)
+    return data
+
+
+def _default(obj):
+    # asyncpg hands back its own UUID subclass, which orjson does not recognise.
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """Serialize already-shaped content without response-model validation."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
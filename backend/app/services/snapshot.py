@@ -0,0 +1,298 @@
+"""Static snapshot of the public datasets, served by nginx without the backend.
+
+An export renders, from one consistent read of the database:
+
+    persons/<bucket>.json   map records alive in [bucket, bucket + SNAPSHOT_BUCKET_YEARS)
+    markers.json            /api/timeline/person-markers
+    eras.json               /api/timeline/eras
+    dictionaries.json       /api/dictionaries (names for the codes in person records)
+    welcome.json            /api/settings/welcome
+    manifest.json           version, dataset version, bucket size and file list
+
+into a new directory SNAPSHOT_DIR/<version>/, each file with a gzip (and,
+when the brotli package is installed, brotli) sibling for nginx's
+gzip_static. The `current` symlink is then switched to the new directory
+with an atomic rename, and all but the newest SNAPSHOT_KEEP_VERSIONS
+versions are pruned. Version directories are immutable, so clients holding
+an older manifest keep working until it is pruned.
+
+Usage:
+    python -m app.services.snapshot            # export unless already up to date
+    python -m app.services.snapshot --force
+"""
+import argparse
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session, engine
+from app.models.dataset_version import DatasetVersion
+from app.models.person import Person
+from app.models.site_settings import SiteSettings
+from app.services.change_feed import Change, register_invalidator
+from app.services.dictionaries import load_categories, load_eras
+from app.services.jobs import JobContext, enqueue, register_job
+from app.services.serialization import MAP_FIELDS, YEAR_RANGE_FIELDS, dumps, person_columns, rows_to_dicts
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CURRENT = "current"
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+# _lock orders exports within a process; the flock on SNAPSHOT_DIR/.lock across
+# processes (job workers of several backends, the CLI).
+_lock = asyncio.Lock()
+_state = {"last_export": None, "last_error": None, "scheduled": False}
+
+
+def bucket_start(year: int, bucket_years: int) -> int:
+    return year // bucket_years * bucket_years
+
+
+def shard_persons(records: list[dict], bucket_years: int) -> dict[int, list[dict]]:
+    """Group map records into every bucket their lifespan overlaps, keeping input order."""
+    shards: dict[int, list[dict]] = {}
+    for record in records:
+        first = bucket_start(record["birth_year"], bucket_years)
+        last = bucket_start(record["death_year"], bucket_years)
+        for start in range(first, last + 1, bucket_years):
+            shards.setdefault(start, []).append(record)
+    return shards
+
+
+async def load_datasets() -> dict:
+    """Read everything a snapshot contains in one REPEATABLE READ transaction."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            dataset_version = (await conn.execute(
+                select(DatasetVersion.version).where(DatasetVersion.id == 1)
+            )).scalar_one()
+            persons = (await conn.execute(
+                select(*person_columns(MAP_FIELDS))
+                .where(
+                    Person.is_published == True,
+                    Person.birth_lat.isnot(None),
+                    Person.birth_lon.isnot(None),
+                )
+                .order_by(Person.name)
+            )).all()
+            markers = (await conn.execute(
+                select(*person_columns(YEAR_RANGE_FIELDS))
+                .where(Person.is_published == True)
+                .order_by(Person.birth_year)
+            )).all()
+            eras = await load_eras(conn)
+            categories = await load_categories(conn)
+            welcome = (await conn.execute(
+                select(SiteSettings.key, SiteSettings.value).where(SiteSettings.key.like("welcome_%"))
+            )).all()
+
+    return {
+        "dataset_version": dataset_version,
+        "persons": rows_to_dicts(persons, MAP_FIELDS),
+        "markers": rows_to_dicts(markers, YEAR_RANGE_FIELDS),
+        "eras": eras,
+        "dictionaries": {"eras": eras, "categories": categories},
+        "welcome": dict(welcome),
+    }
+
+
+def _write(directory: Path, name: str, body: bytes) -> dict:
+    path = directory / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    # mtime=0 keeps the .gz byte-identical across exports of the same data.
+    (directory / f"{name}.gz").write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        (directory / f"{name}.br").write_bytes(brotli.compress(body, quality=11))
+    return {"path": name, "bytes": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+
+
+def write_snapshot(root: Path, data: dict, bucket_years: int) -> dict:
+    """Write a complete version directory next to `current` and return its manifest."""
+    generated_at = datetime.now(timezone.utc)
+    version = f"v{data['dataset_version']}-{generated_at:%Y%m%dT%H%M%S%f}"
+    root.mkdir(parents=True, exist_ok=True)
+    # Written under a dot-name so a half-written export is never linked or pruned as a version.
+    staging = root / f".{version}"
+    staging.mkdir()
+    try:
+        shards = {}
+        for start, records in sorted(shard_persons(data["persons"], bucket_years).items()):
+            entry = _write(staging, f"persons/{start}.json", dumps(records))
+            shards[str(start)] = {**entry, "count": len(records)}
+
+        manifest = {
+            "version": version,
+            "dataset_version": data["dataset_version"],
+            "generated_at": generated_at.isoformat(),
+            "bucket_years": bucket_years,
+            "persons_count": len(data["persons"]),
+            "shards": shards,
+            "files": {
+                name: _write(staging, f"{name}.json", dumps(data[name]))
+                for name in ("markers", "eras", "dictionaries", "welcome")
+            },
+        }
+        _write(staging, MANIFEST, dumps(manifest))
+        staging.rename(root / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _switch_current(root, version)
+    return manifest
+
+
+def _switch_current(root: Path, version: str):
+    # Relative target, so the link resolves wherever the directory is mounted (backend and nginx).
+    tmp_link = root / f".{CURRENT}.{os.getpid()}"
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    tmp_link.symlink_to(version, target_is_directory=True)
+    os.replace(tmp_link, root / CURRENT)
+
+
+def prune_versions(root: Path, keep: int) -> list[str]:
+    current = os.readlink(root / CURRENT) if (root / CURRENT).is_symlink() else None
+    versions = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.is_symlink() and p.name.startswith("v")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    removed = []
+    for path in versions[keep:]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+    return removed
+
+
+def read_manifest(root: Path | None = None) -> dict | None:
+    path = (root or settings.SNAPSHOT_DIR) / CURRENT / MANIFEST
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+async def export_snapshot(force: bool = False) -> dict:
+    """Export a new snapshot unless `current` already matches the dataset version."""
+    root = settings.SNAPSHOT_DIR
+    async with _lock:
+        root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(root / LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            return await _export_locked(root, force)
+        finally:
+            os.close(fd)
+
+
+async def _export_locked(root: Path, force: bool) -> dict:
+    started = time.perf_counter()
+    data = await load_datasets()
+    current = await asyncio.to_thread(read_manifest, root)
+    if not force and current and current.get("dataset_version") == data["dataset_version"]:
+        return {"exported": False, "manifest": current}
+
+    manifest = await asyncio.to_thread(write_snapshot, root, data, settings.SNAPSHOT_BUCKET_YEARS)
+    pruned = await asyncio.to_thread(prune_versions, root, settings.SNAPSHOT_KEEP_VERSIONS)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    _state["last_export"] = {"version": manifest["version"], "elapsed_ms": elapsed_ms}
+    print(
+        f"[SNAPSHOT] Exported {manifest['version']}: {manifest['persons_count']} persons, "
+        f"{len(manifest['shards'])} shards in {elapsed_ms} ms; pruned {len(pruned)}"
+    )
+    return {"exported": True, "manifest": manifest, "pruned": pruned, "elapsed_ms": elapsed_ms}
+
+
+def export_summary(result: dict) -> dict:
+    manifest = result["manifest"]
+    return {
+        "exported": result["exported"],
+        "version": manifest["version"],
+        "dataset_version": manifest["dataset_version"],
+        "shards": len(manifest["shards"]),
+        "pruned": result.get("pruned", []),
+        "elapsed_ms": result.get("elapsed_ms"),
+    }
+
+
+async def _export_job(job: JobContext) -> dict:
+    return export_summary(await export_snapshot(force=bool(job.payload.get("force"))))
+
+
+register_job("snapshot_export", _export_job)
+
+
+def snapshot_status() -> dict:
+    manifest = read_manifest()
+    return {
+        "auto_export": settings.SNAPSHOT_AUTO_EXPORT,
+        "current": {k: v for k, v in manifest.items() if k not in ("shards", "files")} if manifest else None,
+        **_state,
+    }
+
+
+async def _enqueue_export():
+    try:
+        async with async_session() as session:
+            await enqueue(
+                session, "snapshot_export", {}, unique=True,
+                delay_seconds=settings.SNAPSHOT_AUTO_EXPORT_DELAY_SECONDS,
+            )
+            await session.commit()
+        _state["last_error"] = None
+    except Exception as e:
+        _state["last_error"] = str(e)
+        print(f"[SNAPSHOT] Auto export could not be queued: {e}")
+    finally:
+        _state["scheduled"] = False
+
+
+def _on_change(change: Change | None):
+    # Every worker gets the notification; enqueue(unique=True) leaves one queued
+    # export for all of them, and edits made before it runs join that job.
+    if not settings.SNAPSHOT_AUTO_EXPORT or _state["scheduled"]:
+        return
+    _state["scheduled"] = True
+    asyncio.get_running_loop().create_task(_enqueue_export())
+
+
+register_invalidator(_on_change)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="export even if the current snapshot is up to date")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            return await export_snapshot(force=args.force)
+        finally:
+            await engine.dispose()
+
+    result = asyncio.run(main_async())
+    if not result["exported"]:
+        print(f"[SNAPSHOT] {result['manifest']['version']} is up to date")
+
+
+if __name__ == "__main__":
+    main()
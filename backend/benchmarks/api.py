@@ -0,0 +1,137 @@
+"""
+Load-test the public read endpoints and report latency percentiles as JSON.
+
+Scenarios:
+  persons_by_year  /api/persons?year=  driven by a slider-like random walk
+  person_markers   /api/timeline/person-markers
+  person_detail    /api/persons/{id}   for a random sample of published ids
+
+By default requests go through an in-process ASGI client (no sockets, no
+nginx) with admission control off; pass --base-url to measure a running
+server instead, started with ADMISSION_CONTROL=false for the same reason.
+Allocation figures are only available in-process.
+
+Usage:
+    python -m benchmarks.api
+    python -m benchmarks.api --requests 2000 --concurrency 32 --output run.json
+    python -m benchmarks.api --base-url http://localhost:8000 --scenario persons_by_year
+"""
+
+import argparse
+import asyncio
+import random
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from benchmarks.harness import (
+    ASGIClient, HTTPClient, measure_allocations, run_load, run_metadata, write_report,
+)
+
+YEAR_MIN = -3000
+YEAR_MAX = 2026
+SCENARIOS = ["persons_by_year", "person_markers", "person_detail"]
+
+
+def slider_years(count: int, rng: random.Random) -> list[int]:
+    """Mimic a user dragging the timeline: short steps, occasional jumps and pauses."""
+    years = []
+    year = rng.randint(1000, YEAR_MAX)
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            year = rng.randint(YEAR_MIN, YEAR_MAX)
+        elif roll < 0.20:
+            pass  # the slider rests on the same year
+        else:
+            year += rng.choice((-1, 1)) * rng.randint(1, 25)
+        year = max(YEAR_MIN, min(YEAR_MAX, year))
+        years.append(year)
+    return years
+
+
+async def scenario_urls(name: str, count: int, rng: random.Random) -> list[str]:
+    if name == "persons_by_year":
+        return [f"/api/persons?year={year}" for year in slider_years(count, rng)]
+    if name == "person_markers":
+        return ["/api/timeline/person-markers"] * count
+    if name == "person_detail":
+        async with engine.connect() as conn:
+            ids = (await conn.execute(
+                text("SELECT id FROM persons WHERE is_published ORDER BY random() LIMIT 1000")
+            )).scalars().all()
+        if not ids:
+            return []
+        return [f"/api/persons/{rng.choice(ids)}" for _ in range(count)]
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    async with engine.connect() as conn:
+        row_count = (await conn.execute(text("SELECT count(*) FROM persons"))).scalar()
+
+    report = {
+        "meta": run_metadata(
+            target=args.base_url or "in-process",
+            persons_rows=row_count,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            seed=args.seed,
+        ),
+        "scenarios": {},
+    }
+
+    async def run_scenarios(client, in_process: bool):
+        for name in args.scenario or SCENARIOS:
+            urls = await scenario_urls(name, args.requests, rng)
+            if not urls:
+                print(f"[{name}] skipped: no data")
+                continue
+            await run_load(client, urls[: args.warmup], args.concurrency)
+            result = await run_load(client, urls, args.concurrency)
+            if in_process and args.alloc_requests:
+                result["allocations"] = await measure_allocations(client, urls[: args.alloc_requests])
+            report["scenarios"][name] = result
+            lat = result["latency_ms"]
+            print(
+                f"[{name}] {result['throughput_rps']} req/s  "
+                f"p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms  errors={result['errors']}"
+            )
+
+    if args.base_url:
+        await run_scenarios(HTTPClient(args.base_url), in_process=False)
+    else:
+        # Every in-process request comes from 127.0.0.1, so per-IP limits would turn the run into 429s.
+        settings.ADMISSION_CONTROL = False
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            await run_scenarios(ASGIClient(app), in_process=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="untimed requests before each scenario")
+    parser.add_argument("--alloc-requests", type=int, default=100, help="requests traced for allocations (0 = off)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the access pattern")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            return await run(args)
+        finally:
+            await engine.dispose()
+
+    write_report(asyncio.run(main_async()), args.output)
+
+
+if __name__ == "__main__":
+    main()
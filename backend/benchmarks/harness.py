@@ -0,0 +1,202 @@
+"""Shared pieces for the benchmark drivers: clients, timing and reporting."""
+
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+    headers: dict = field(default_factory=dict)
+
+
+class ASGIClient:
+    """Minimal in-process client: calls the ASGI app directly, no sockets involved."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def get(self, url: str, headers: dict | None = None) -> Response:
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        chunks: list[bytes] = []
+        result = {"status": 0, "headers": {}}
+        sent_request = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal sent_request
+            if not sent_request:
+                sent_request = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                result["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished.set()
+
+        await self.app(scope, receive, send)
+        finished.set()
+        return Response(result["status"], b"".join(chunks), result["headers"])
+
+
+class HTTPClient:
+    """Client for a running server; blocking urllib calls run in worker threads."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def _get(self, url: str, headers: dict | None) -> Response:
+        request = urllib.request.Request(self.base_url + url, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as resp:
+                return Response(resp.status, resp.read(), dict(resp.headers))
+        except urllib.error.HTTPError as e:
+            return Response(e.code, e.read(), dict(e.headers))
+
+    async def get(self, url: str, headers: dict | None = None) -> Response:
+        return await asyncio.to_thread(self._get, url, headers)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def run_load(client, urls: list[str], concurrency: int) -> dict:
+    """Issue every url once with at most `concurrency` requests in flight."""
+    latencies: list[float] = []
+    errors = 0
+    total_bytes = 0
+    queue = iter(urls)
+
+    async def worker():
+        nonlocal errors, total_bytes
+        for url in queue:
+            started = time.perf_counter()
+            resp = await client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            total_bytes += len(resp.body)
+            if resp.status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_bytes": int(total_bytes / len(latencies)) if latencies else 0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+
+async def measure_allocations(client, urls: list[str]) -> dict:
+    """Run the urls sequentially under tracemalloc and report allocation figures.
+
+    peak_kib_per_request is, for each request, the high-water mark of traced
+    memory above what was traced when it started: the short-lived allocations
+    (decoded rows, dicts, encoded bodies) the request holds at once, which a
+    before/after diff never sees. retained_blocks_per_request is the net number
+    of blocks still allocated after the whole run (caches, leaks).
+
+    Kept separate from run_load because tracing slows every allocation down and
+    would distort the latency figures.
+    """
+    gc.collect()
+    collections_before = sum(s["collections"] for s in gc.get_stats())
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peaks = []
+    for url in urls:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await client.get(url)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    collections_after = sum(s["collections"] for s in gc.get_stats())
+
+    diff = after.compare_to(before, "filename")
+    retained_blocks = sum(max(stat.count_diff, 0) for stat in diff)
+    return {
+        "requests": len(urls),
+        "peak_kib_per_request": {
+            "mean": round(statistics.fmean(peaks) / 1024, 1) if peaks else 0.0,
+            "p95": round(percentile(sorted(peaks), 95) / 1024, 1),
+            "max": round(max(peaks, default=0) / 1024, 1),
+        },
+        "retained_blocks_per_request": round(retained_blocks / max(len(urls), 1), 1),
+        "gc_collections": collections_after - collections_before,
+    }
+
+
+def run_metadata(**extra) -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def write_report(report: dict, output: str | None):
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        Path(output).write_text(payload + "\n", encoding="utf-8")
+        print(f"Report written to {output}")
+    else:
+        print(payload)
@@ -0,0 +1,168 @@
+"""
+Seed a synthetic persons table for benchmarking.
+
+Synthetic rows are tagged with name_original = '__benchmark__' so they can be
+removed again without touching real data. Generation is deterministic for a
+given --seed, so two runs with the same arguments load identical data.
+
+Usage:
+    python -m benchmarks.seed --rows 100000          # top up to 100k synthetic rows
+    python -m benchmarks.seed --rows 1000000 --reset # drop old synthetic rows first
+    python -m benchmarks.seed --clean                # only remove synthetic rows
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+
+BENCH_MARKER = "__benchmark__"
+BATCH_SIZE = 50_000
+
+# (lat, lon, weight): rough centres of where the catalogue's people were born.
+BIRTH_CENTRES = [
+    (41.9, 12.5, 8),    # Rome
+    (37.98, 23.73, 6),  # Athens
+    (30.04, 31.24, 5),  # Cairo
+    (41.01, 28.98, 4),  # Istanbul
+    (33.31, 44.36, 3),  # Baghdad
+    (48.86, 2.35, 7),   # Paris
+    (51.51, -0.13, 7),  # London
+    (52.52, 13.40, 5),  # Berlin
+    (48.21, 16.37, 4),  # Vienna
+    (40.42, -3.70, 4),  # Madrid
+    (55.76, 37.62, 7),  # Moscow
+    (59.94, 30.31, 5),  # St Petersburg
+    (50.45, 30.52, 3),  # Kyiv
+    (39.90, 116.40, 5), # Beijing
+    (35.01, 135.77, 3), # Kyoto
+    (28.61, 77.21, 4),  # Delhi
+    (40.71, -74.01, 5), # New York
+    (38.90, -77.04, 3), # Washington
+    (-23.55, -46.63, 2),# São Paulo
+]
+CATEGORIES = ["ruler", "scientist", "artist", "writer", "philosopher", "military", "religious", "explorer"]
+ERA_BOUNDS = [
+    ("Древний Египет", -3000, -800),
+    ("Античность", -800, 476),
+    ("Средневековье", 476, 1300),
+    ("Возрождение", 1300, 1600),
+    ("Новое время", 1600, 1900),
+    ("Новейшее время", 1900, 2026),
+]
+COLUMNS = [
+    "name", "name_original", "birth_year", "death_year",
+    "birth_year_approximate", "death_year_approximate",
+    "birth_lat", "birth_lon", "death_lat", "death_lon",
+    "birth_place_name", "death_place_name",
+    "main_photo_url", "description", "activity_description", "short_bio",
+    "era", "category", "is_published",
+]
+
+
+def _birth_year(rng: random.Random) -> int:
+    # Density grows towards the present, like any historical catalogue.
+    return int(2000 - 5000 * rng.random() ** 3)
+
+
+def _era_for(year: int) -> str:
+    for name, start, end in ERA_BOUNDS:
+        if start <= year < end:
+            return name
+    return ERA_BOUNDS[0][0] if year < ERA_BOUNDS[0][1] else ERA_BOUNDS[-1][0]
+
+
+def generate_rows(count: int, start: int, seed: int):
+    """Yield `count` synthetic rows as tuples ordered like COLUMNS."""
+    rng = random.Random(seed + start)
+    centres = [(lat, lon) for lat, lon, _ in BIRTH_CENTRES]
+    weights = [w for _, _, w in BIRTH_CENTRES]
+
+    for i in range(start, start + count):
+        birth = _birth_year(rng)
+        lifespan = max(18, min(100, int(rng.gauss(62 if birth > 1500 else 50, 15))))
+        death = min(birth + lifespan, 2026)
+
+        if rng.random() < 0.05:
+            birth_lat = birth_lon = None
+        else:
+            lat, lon = rng.choices(centres, weights)[0]
+            birth_lat = round(lat + rng.gauss(0, 3), 4)
+            birth_lon = round(lon + rng.gauss(0, 4), 4)
+        death_lat = None if birth_lat is None else round(birth_lat + rng.gauss(0, 2), 4)
+        death_lon = None if birth_lon is None else round(birth_lon + rng.gauss(0, 2), 4)
+
+        category = rng.choice(CATEGORIES)
+        yield (
+            f"Bench Person {i:07d}", BENCH_MARKER, birth, death,
+            birth < 500, birth < 500,
+            birth_lat, birth_lon, death_lat, death_lon,
+            f"Place {i % 997}", f"Place {(i * 7) % 997}",
+            "/uploads/seed/default.jpg",
+            "Synthetic person generated for benchmarks. " * rng.randint(3, 12),
+            f"Synthetic {category}", "Short synthetic bio. " * rng.randint(1, 4),
+            _era_for(birth), category, rng.random() < 0.95,
+        )
+
+
+async def clean():
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("DELETE FROM persons WHERE name_original = :marker"), {"marker": BENCH_MARKER}
+        )
+    print(f"Removed {result.rowcount} synthetic persons")
+
+
+async def seed(rows: int, seed: int = 42, reset: bool = False):
+    if reset:
+        await clean()
+
+    async with engine.connect() as conn:
+        existing = (await conn.execute(
+            text("SELECT count(*) FROM persons WHERE name_original = :marker"), {"marker": BENCH_MARKER}
+        )).scalar()
+        missing = rows - existing
+        if missing <= 0:
+            print(f"{existing} synthetic persons already present, nothing to do")
+            return
+
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        started = time.perf_counter()
+        for offset in range(existing, rows, BATCH_SIZE):
+            count = min(BATCH_SIZE, rows - offset)
+            await driver.copy_records_to_table(
+                "persons", records=list(generate_rows(count, offset, seed)), columns=COLUMNS,
+            )
+            print(f"  {offset + count}/{rows} rows")
+        await driver.execute("ANALYZE persons")
+        await conn.commit()
+        print(f"Inserted {missing} synthetic persons in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="target number of synthetic rows")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible data")
+    parser.add_argument("--reset", action="store_true", help="remove existing synthetic rows first")
+    parser.add_argument("--clean", action="store_true", help="only remove synthetic rows")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            if args.clean:
+                await clean()
+            else:
+                await seed(args.rows, args.seed, args.reset)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
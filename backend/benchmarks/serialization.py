@@ -0,0 +1,141 @@
+"""
+Micro-benchmarks for building the map payloads.
+
+Measures, per dataset size:
+  hydrate_orm         select(Person) -> ORM entities (identity map, all columns)
+  hydrate_core        select(<response columns>) -> Core row tuples
+  pydantic_orm        list[Model] validation from ORM objects + JSON dump
+  orjson_orm          field copy from ORM objects + orjson.dumps
+  orjson_core         Core rows -> dicts + orjson.dumps (the public routes' path)
+  msgspec_core        Core rows -> dicts + msgspec.json.encode (if msgspec is installed)
+
+Hydration timings include the round-trip to Postgres; encoding timings are
+pure CPU on data that was loaded once. Run benchmarks.seed first so the
+larger sizes have enough rows.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --sizes 1000,10000,100000 --repeat 5 --output ser.json
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, text
+
+from app.database import async_session, engine
+from app.models.person import Person
+from app.schemas import PersonMapResponse, PersonYearRangeResponse
+from app.services.serialization import (
+    MAP_FIELDS, YEAR_RANGE_FIELDS, dumps, person_columns, rows_to_dicts, to_dicts,
+)
+from benchmarks.harness import run_metadata, write_report
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+PAYLOADS = {
+    "map": (PersonMapResponse, MAP_FIELDS),
+    "year_range": (PersonYearRangeResponse, YEAR_RANGE_FIELDS),
+}
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+
+async def timed_async(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+
+async def bench_size(size: int, repeat: int) -> dict:
+    results = {}
+    for payload, (model, fields) in PAYLOADS.items():
+        orm_query = select(Person).order_by(Person.id).limit(size)
+        core_query = select(*person_columns(fields)).order_by(Person.id).limit(size)
+
+        async def hydrate_orm():
+            async with async_session() as session:
+                return (await session.execute(orm_query)).scalars().all()
+
+        async def hydrate_core():
+            async with engine.connect() as conn:
+                return (await conn.execute(core_query)).all()
+
+        orm_objs = await hydrate_orm()
+        core_rows = await hydrate_core()
+        adapter = TypeAdapter(list[model])
+
+        entry = {
+            "rows": len(core_rows),
+            "hydrate_orm": await timed_async(hydrate_orm, repeat),
+            "hydrate_core": await timed_async(hydrate_core, repeat),
+            "pydantic_orm": timed(
+                lambda: adapter.dump_json(adapter.validate_python(orm_objs, from_attributes=True)), repeat,
+            ),
+            "orjson_orm": timed(lambda: dumps(to_dicts(orm_objs, fields)), repeat),
+            "orjson_core": timed(lambda: dumps(rows_to_dicts(core_rows, fields)), repeat),
+        }
+        if msgspec is not None:
+            encoder = msgspec.json.Encoder(enc_hook=str)
+            entry["msgspec_core"] = timed(lambda: encoder.encode(rows_to_dicts(core_rows, fields)), repeat)
+        results[payload] = entry
+
+        print(f"[{size} rows / {payload}] " + "  ".join(
+            f"{name}={value['median_ms']}ms" for name, value in entry.items() if isinstance(value, dict)
+        ))
+    return results
+
+
+async def run(args) -> dict:
+    async with engine.connect() as conn:
+        available = (await conn.execute(text("SELECT count(*) FROM persons"))).scalar()
+
+    report = {
+        "meta": run_metadata(persons_rows=available, repeat=args.repeat, msgspec=msgspec is not None),
+        "sizes": {},
+    }
+    for size in args.sizes:
+        if size > available:
+            print(f"[{size} rows] skipped: only {available} persons in the database")
+            continue
+        report["sizes"][str(size)] = await bench_size(size, args.repeat)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 10_000, 100_000],
+        help="comma-separated row counts",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            return await run(args)
+        finally:
+            await engine.dispose()
+
+    write_report(asyncio.run(main_async()), args.output)
+
+
+if __name__ == "__main__":
+    main()
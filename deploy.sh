@@ -193,11 +193,40 @@ server {
         proxy_connect_timeout 10s;
     }
 
-    # Uploaded files → backend
+    # Uploaded files → straight from disk (sendfile, Range, ETag).
+    # Admin uploads get a fresh uuid name, so their URLs never change content.
     location /uploads/ {
-        proxy_pass http://backend:8000/uploads/;
-        proxy_set_header Host $host;
-        expires 7d;
+        alias /srv/uploads/;
+        sendfile on;
+        tcp_nopush on;
+        open_file_cache max=2000 inactive=60s;
+        expires 1y;
+        add_header Cache-Control "public, immutable";
+    }
+
+    # Seed photos are named after the person, not the content, and
+    # scripts/fetch_wiki_photos.py re-downloads them in place: revalidate daily.
+    location /uploads/seed/ {
+        alias /srv/uploads/seed/;
+        sendfile on;
+        tcp_nopush on;
+        open_file_cache max=2000 inactive=60s;
+        expires 1d;
+    }
+
+    # Static snapshot of public data → files on disk.
+    # current/ is switched to a new version by every export; versioned
+    # directories (/snapshot/v.../) never change.
+    location /snapshot/current/ {
+        alias /srv/snapshots/current/;
+        gzip_static on;
+        add_header Cache-Control "no-cache";
+    }
+
+    location /snapshot/ {
+        alias /srv/snapshots/;
+        gzip_static on;
+        expires 1y;
         add_header Cache-Control "public, immutable";
     }
 
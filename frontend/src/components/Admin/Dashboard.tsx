@@ -3,20 +3,6 @@ import { Link } from 'react-router-dom';
 import { getStats } from '../../services/api';
 import type { Stats } from '../../types';
 
-const ERA_COLORS: Record<string, string> = {
-  'Древний мир': '#8B4513',
-  'Средневековье': '#4A5568',
-  'Новое время': '#2B6CB0',
-  'Новейшее время': '#E53E3E',
-};
-
-const CAT_LABELS: Record<string, string> = {
-  ruler: 'Правители',
-  scientist: 'Учёные',
-  artist: 'Деятели искусств',
-  military: 'Военачальники',
-};
-
 const Dashboard: React.FC = () => {
   const [stats, setStats] = useState<Stats | null>(null);
   const [loading, setLoading] = useState(true);
@@ -77,7 +63,7 @@ const Dashboard: React.FC = () => {
                     className="h-full rounded-full transition-all duration-500"
                     style={{
                       width: `${(item.count / stats.total_persons) * 100}%`,
-                      backgroundColor: ERA_COLORS[item.era] || '#e94560',
+                      backgroundColor: item.color || '#e94560',
                     }}
                   />
                 </div>
@@ -95,7 +81,7 @@ const Dashboard: React.FC = () => {
             {stats.by_category.map((item) => (
               <div key={item.era}>
                 <div className="flex justify-between text-sm mb-1">
-                  <span className="text-white/80">{CAT_LABELS[item.era] || item.era}</span>
+                  <span className="text-white/80">{item.label || item.era}</span>
                   <span className="text-white/50">{item.count}</span>
                 </div>
                 <div className="h-2 bg-white/[0.06] rounded-full overflow-hidden">
@@ -2,9 +2,9 @@ import React, { useEffect, useState, useCallback } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import {
   adminGetPerson, adminCreatePerson, adminUpdatePerson,
-  uploadImage, adminAddPhoto, adminDeletePhoto,
+  uploadImage, adminSetPhotos, adminDeletePhoto, getDictionaries,
 } from '../../services/api';
-import type { Person, Photo } from '../../types';
+import type { Dictionaries, Person, Photo } from '../../types';
 import toast from 'react-hot-toast';
 
 interface FormData {
@@ -24,8 +24,8 @@ interface FormData {
   description: string;
   activity_description: string;
   short_bio: string;
-  era: string;
-  category: string;
+  era_code: string;
+  category_code: string;
   is_published: boolean;
 }
 
@@ -35,7 +35,7 @@ const emptyForm: FormData = {
   birth_lat: '', birth_lon: '', death_lat: '', death_lon: '',
   birth_place_name: '', death_place_name: '',
   main_photo_url: '', description: '', activity_description: '',
-  short_bio: '', era: '', category: '', is_published: true,
+  short_bio: '', era_code: '', category_code: '', is_published: true,
 };
 
 const PersonForm: React.FC = () => {
@@ -48,6 +48,11 @@ const PersonForm: React.FC = () => {
   const [loading, setLoading] = useState(false);
   const [saving, setSaving] = useState(false);
   const [uploading, setUploading] = useState(false);
+  const [dictionaries, setDictionaries] = useState<Dictionaries>({ eras: [], categories: [] });
+
+  useEffect(() => {
+    getDictionaries().then(setDictionaries).catch(() => {});
+  }, []);
 
   useEffect(() => {
     if (!isEdit) return;
@@ -71,8 +76,9 @@ const PersonForm: React.FC = () => {
           description: p.description,
           activity_description: p.activity_description || '',
           short_bio: p.short_bio || '',
-          era: p.era || '',
-          category: p.category || '',
+          // An era assigned from the life dates stays automatic, so it follows edited years.
+          era_code: p.era_code != null && !p.era_auto ? String(p.era_code) : '',
+          category_code: p.category_code != null ? String(p.category_code) : '',
           is_published: p.is_published,
         });
         setPhotos(p.photos);
@@ -112,14 +118,12 @@ const PersonForm: React.FC = () => {
     if (!files?.length || !isEdit) return;
     setUploading(true);
     try {
-      for (const file of Array.from(files)) {
-        const url = await uploadImage(file);
-        const updated = await adminAddPhoto(id!, {
-          photo_url: url,
-          display_order: photos.length,
-        });
-        setPhotos(updated.photos);
-      }
+      const urls = await Promise.all(Array.from(files).map(uploadImage));
+      const updated = await adminSetPhotos(id!, [
+        ...photos.map((p) => ({ id: p.id, caption: p.caption })),
+        ...urls.map((url) => ({ photo_url: url })),
+      ]);
+      setPhotos(updated.photos);
       toast.success('Фото добавлены в галерею');
     } catch {
       toast.error('Ошибка загрузки');
@@ -165,8 +169,9 @@ const PersonForm: React.FC = () => {
         description: form.description,
         activity_description: form.activity_description || null,
         short_bio: form.short_bio || null,
-        era: form.era || null,
-        category: form.category || null,
+        // Without an era the server assigns one from the life dates.
+        era_code: form.era_code ? parseInt(form.era_code, 10) : null,
+        category_code: form.category_code ? parseInt(form.category_code, 10) : null,
         is_published: form.is_published,
       };
 
@@ -262,30 +267,20 @@ const PersonForm: React.FC = () => {
           <div className="flex items-center gap-4">
             <div className="flex-1">
               <label className="block text-sm text-white/60 mb-1">Эпоха</label>
-              <select name="era" value={form.era} onChange={handleChange} className="input-field">
-                <option value="">—</option>
-                <option value="Древний мир">Древний мир</option>
-                <option value="Средневековье">Средневековье</option>
-                <option value="Новое время">Новое время</option>
-                <option value="Новейшее время">Новейшее время</option>
+              <select name="era_code" value={form.era_code} onChange={handleChange} className="input-field">
+                <option value="">По годам жизни</option>
+                {dictionaries.eras.map((era) => (
+                  <option key={era.code} value={era.code}>{era.name}</option>
+                ))}
               </select>
             </div>
             <div className="flex-1">
               <label className="block text-sm text-white/60 mb-1">Категория</label>
-              <select name="category" value={form.category} onChange={handleChange} className="input-field">
+              <select name="category_code" value={form.category_code} onChange={handleChange} className="input-field">
                 <option value="">—</option>
-                <option value="ruler">Правитель</option>
-                <option value="scientist">Учёный</option>
-                <option value="philosopher">Философ</option>
-                <option value="artist">Деятель искусств</option>
-                <option value="writer">Писатель / Поэт</option>
-                <option value="military">Военачальник</option>
-                <option value="politician">Политик / Оратор</option>
-                <option value="religious">Религиозный деятель</option>
-                <option value="engineer">Инженер / Архитектор</option>
-                <option value="doctor">Врач</option>
-                <option value="explorer">Путешественник</option>
-                <option value="athlete">Атлет</option>
+                {dictionaries.categories.map((category) => (
+                  <option key={category.code} value={category.code}>{category.label}</option>
+                ))}
               </select>
             </div>
           </div>
@@ -1,7 +1,7 @@
 import React, { useEffect, useState, useCallback } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { adminListPersons, adminDeletePerson } from '../../services/api';
-import type { Person } from '../../types';
+import { adminListPersons, adminDeletePerson, getDictionaries, resizedImageUrl } from '../../services/api';
+import type { Dictionaries, Person } from '../../types';
 import toast from 'react-hot-toast';
 
 const formatYear = (y: number) => (y < 0 ? `${Math.abs(y)} до н.э.` : `${y}`);
@@ -12,14 +12,17 @@ const PersonList: React.FC = () => {
   const [page, setPage] = useState(1);
   const [pages, setPages] = useState(1);
   const [search, setSearch] = useState('');
-  const [era, setEra] = useState('');
+  const [eraCode, setEraCode] = useState('');
+  const [dictionaries, setDictionaries] = useState<Dictionaries>({ eras: [], categories: [] });
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
 
   const loadPersons = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await adminListPersons({ page, per_page: 15, search, era });
+      const data = await adminListPersons({
+        page, per_page: 15, search, era_code: eraCode ? parseInt(eraCode, 10) : undefined,
+      });
       setPersons(data.items);
       setTotal(data.total);
       setPages(data.pages);
@@ -28,12 +31,18 @@ const PersonList: React.FC = () => {
     } finally {
       setLoading(false);
     }
-  }, [page, search, era]);
+  }, [page, search, eraCode]);
 
   useEffect(() => {
     loadPersons();
   }, [loadPersons]);
 
+  useEffect(() => {
+    getDictionaries().then(setDictionaries).catch(() => {});
+  }, []);
+
+  const categoryLabels = new Map(dictionaries.categories.map((c) => [c.code, c.label]));
+
   const handleDelete = async (id: string, name: string) => {
     if (!window.confirm(`Удалить "${name}"?`)) return;
     try {
@@ -58,15 +67,14 @@ const PersonList: React.FC = () => {
             className="input-field w-64"
           />
           <select
-            value={era}
-            onChange={(e) => { setEra(e.target.value); setPage(1); }}
+            value={eraCode}
+            onChange={(e) => { setEraCode(e.target.value); setPage(1); }}
             className="input-field w-48"
           >
             <option value="">Все эпохи</option>
-            <option value="Древний мир">Древний мир</option>
-            <option value="Средневековье">Средневековье</option>
-            <option value="Новое время">Новое время</option>
-            <option value="Новейшее время">Новейшее время</option>
+            {dictionaries.eras.map((era) => (
+              <option key={era.code} value={era.code}>{era.name}</option>
+            ))}
           </select>
         </div>
         <div className="flex items-center gap-3">
@@ -115,7 +123,7 @@ const PersonList: React.FC = () => {
                     <td className="p-3">
                       <div className="w-10 h-10 rounded-lg overflow-hidden bg-white/[0.06]">
                         <img
-                          src={p.main_photo_url}
+                          src={resizedImageUrl(p.main_photo_url, 40)}
                           alt={p.name}
                           className="w-full h-full object-cover"
                           onError={(e) => { (e.target as HTMLImageElement).style.display = 'none'; }}
@@ -130,7 +138,9 @@ const PersonList: React.FC = () => {
                       {formatYear(p.birth_year)} — {formatYear(p.death_year)}
                     </td>
                     <td className="p-3 hidden lg:table-cell text-white/50">{p.era}</td>
-                    <td className="p-3 hidden lg:table-cell text-white/50">{p.category}</td>
+                    <td className="p-3 hidden lg:table-cell text-white/50">
+                      {(p.category_code != null && categoryLabels.get(p.category_code)) || p.category}
+                    </td>
                     <td className="p-3">
                       <span className={`inline-block w-2 h-2 rounded-full ${p.is_published ? 'bg-green-400' : 'bg-yellow-400'}`} />
                     </td>
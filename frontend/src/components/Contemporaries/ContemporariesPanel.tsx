@@ -20,7 +20,7 @@ interface AdultPerson {
   deathYear: number;
   age: number;
   adultFrom: number;
-  era: string | null;
+  eraCode: number | null;
   contemporaries: Contemporary[];
 }
 
@@ -76,7 +76,7 @@ const ContemporariesPanel: React.FC<ContemporariesPanelProps> = ({ year, personM
           deathYear: p.death_year,
           age: year - p.birth_year,
           adultFrom,
-          era: p.era,
+          eraCode: p.era_code,
           contemporaries: contList,
         };
       })
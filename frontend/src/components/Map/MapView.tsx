@@ -1,33 +1,49 @@
-import React, { useEffect, useRef, useCallback, useState } from 'react';
+import React, { useEffect, useRef, useCallback, useMemo, useState } from 'react';
 import L from 'leaflet';
 import 'leaflet.markercluster';
-import type { PersonMap } from '../../types';
+import type { Era, PersonMap, PersonNearby } from '../../types';
+import { getPersonsNearby, resizedImageUrl } from '../../services/api';
 
 interface MapViewProps {
   persons: PersonMap[];
+  eras: Era[];
   onPersonClick: (id: string) => void;
   isLoading: boolean;
   onStyleChange?: (isDark: boolean) => void;
 }
 
-const ERA_COLORS: Record<string, string> = {
-  'Древний мир': '#8B4513',
-  'Средневековье': '#4A5568',
-  'Новое время': '#2B6CB0',
-  'Новейшее время': '#E53E3E',
+const DEFAULT_MARKER_COLOR = '#e94560';
+
+// Search radius for a click on the map: about this many pixels at the current zoom.
+const NEARBY_RADIUS_PX = 60;
+const NEARBY_MAX_RADIUS_KM = 2000;
+
+const formatYear = (y: number): string => (y < 0 ? `${Math.abs(y)} до н.э.` : `${y}`);
+
+const createNearbyList = (persons: PersonNearby[], onPick: (id: string) => void): HTMLElement => {
+  const root = document.createElement('div');
+  root.style.cssText = 'font-family:Inter,sans-serif;max-height:240px;overflow-y:auto;min-width:200px;';
+  const title = document.createElement('div');
+  title.style.cssText = 'font-size:12px;opacity:0.7;margin-bottom:6px;';
+  title.textContent = persons.length ? 'Родились поблизости' : 'Поблизости никто не родился';
+  root.appendChild(title);
+  persons.forEach((p) => {
+    const item = document.createElement('button');
+    item.style.cssText = 'display:block;width:100%;text-align:left;padding:3px 0;font-size:13px;cursor:pointer;background:none;border:0;color:inherit;';
+    item.textContent = `${p.name} (${formatYear(p.birth_year)} — ${formatYear(p.death_year)}), ${Math.round(p.distance_km)} км`;
+    item.onclick = () => onPick(p.id);
+    root.appendChild(item);
+  });
+  return root;
 };
 
-const getMarkerColor = (era: string | null): string =>
-  (era && ERA_COLORS[era]) || '#e94560';
-
 const getInitials = (name: string): string => {
   const parts = name.trim().split(/\s+/);
   if (parts.length >= 2) return (parts[0][0] + parts[1][0]).toUpperCase();
   return name.slice(0, 2).toUpperCase();
 };
 
-const createMarkerIcon = (person: PersonMap) => {
-  const color = getMarkerColor(person.era);
+const createMarkerIcon = (person: PersonMap, color: string) => {
   const initials = getInitials(person.name);
 
   return L.divIcon({
@@ -45,7 +61,10 @@ const createMarkerIcon = (person: PersonMap) => {
       font-size:14px;font-weight:700;
       color:${color};
       letter-spacing:-0.5px;
-    ">${initials}</div>`,
+      position:relative;overflow:hidden;
+    ">${initials}<img src="${resizedImageUrl(person.main_photo_url, 38).replace(/"/g, '&quot;')}" alt="" loading="lazy"
+      style="position:absolute;inset:0;width:100%;height:100%;object-fit:cover;"
+      onerror="this.remove()"></div>`,
     iconSize: [44, 44],
     iconAnchor: [22, 22],
   });
@@ -100,7 +119,8 @@ const TILE_STYLES: TileStyle[] = [
   },
 ];
 
-const MapView: React.FC<MapViewProps> = ({ persons, onPersonClick, isLoading, onStyleChange }) => {
+const MapView: React.FC<MapViewProps> = ({ persons, eras, onPersonClick, isLoading, onStyleChange }) => {
+  const eraColors = useMemo(() => new Map(eras.map((e) => [e.code, e.color])), [eras]);
   const mapRef = useRef<L.Map | null>(null);
   const clusterRef = useRef<L.MarkerClusterGroup | null>(null);
   const tileRef = useRef<L.TileLayer | null>(null);
@@ -108,6 +128,9 @@ const MapView: React.FC<MapViewProps> = ({ persons, onPersonClick, isLoading, on
   const [styleIdx, setStyleIdx] = useState(1);
   const [pickerOpen, setPickerOpen] = useState(false);
   const isDark = TILE_STYLES[styleIdx].dark;
+  // The map click handler is bound once; it reads the latest callback through this ref.
+  const personClickRef = useRef(onPersonClick);
+  personClickRef.current = onPersonClick;
 
   useEffect(() => {
     if (!containerRef.current || mapRef.current) return;
@@ -131,6 +154,25 @@ const MapView: React.FC<MapViewProps> = ({ persons, onPersonClick, isLoading, on
     mapRef.current = map;
     onStyleChange?.(!style.dark);
 
+    // Markers stop their clicks from reaching the map, so this only fires on empty map areas.
+    map.on('click', async (e: L.LeafletMouseEvent) => {
+      const edge = map.containerPointToLatLng(map.latLngToContainerPoint(e.latlng).add([NEARBY_RADIUS_PX, 0]));
+      const radius = Math.min(NEARBY_MAX_RADIUS_KM, Math.max(1, e.latlng.distanceTo(edge) / 1000));
+      const { lat, lng } = e.latlng.wrap();
+      try {
+        const nearby = await getPersonsNearby({ lat, lon: lng, radius, limit: 20 });
+        L.popup({ className: 'glass-tooltip' })
+          .setLatLng(e.latlng)
+          .setContent(createNearbyList(nearby, (id) => {
+            map.closePopup();
+            personClickRef.current(id);
+          }))
+          .openOn(map);
+      } catch {
+        // Nothing to show; the map stays usable.
+      }
+    });
+
     return () => {
       map.remove();
       mapRef.current = null;
@@ -192,7 +234,7 @@ const MapView: React.FC<MapViewProps> = ({ persons, onPersonClick, isLoading, on
       if (person.birth_lat == null || person.birth_lon == null) return;
 
       const marker = L.marker([person.birth_lat, person.birth_lon], {
-        icon: createMarkerIcon(person),
+        icon: createMarkerIcon(person, (person.era_code != null && eraColors.get(person.era_code)) || DEFAULT_MARKER_COLOR),
       });
 
       const years = `${person.birth_year < 0 ? `${Math.abs(person.birth_year)} до н.э.` : person.birth_year} — ${person.death_year < 0 ? `${Math.abs(person.death_year)} до н.э.` : person.death_year}`;
@@ -216,7 +258,7 @@ const MapView: React.FC<MapViewProps> = ({ persons, onPersonClick, isLoading, on
 
     map.addLayer(cluster);
     clusterRef.current = cluster;
-  }, [persons, handlePersonClick]);
+  }, [persons, eraColors, handlePersonClick]);
 
   return (
     <div className="relative w-full h-full">
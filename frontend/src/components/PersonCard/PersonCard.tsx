@@ -1,5 +1,5 @@
 import React, { useEffect, useState, useCallback, useMemo } from 'react';
-import { getPersonDetail } from '../../services/api';
+import { getPersonDetail, prefetchPersonDetails } from '../../services/api';
 import type { Person, PersonYearRange } from '../../types';
 
 interface PersonCardProps {
@@ -95,6 +95,12 @@ const PersonCard: React.FC<PersonCardProps> = ({ personId, onClose, personMarker
     return result;
   }, [person, personMarkers, year]);
 
+  // One batch request warms the cards of the listed contemporaries.
+  useEffect(() => {
+    if (contemporaries.length === 0) return;
+    prefetchPersonDetails(contemporaries.map((c) => c.id)).catch(() => {});
+  }, [contemporaries]);
+
   if (!personId) return null;
 
   const allPhotos = person
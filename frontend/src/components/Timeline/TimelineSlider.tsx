@@ -269,16 +269,6 @@ const TimelineSlider: React.FC<TimelineSliderProps> = ({
     [onYearChange, clampYear]
   );
 
-  const eraPersonCounts = useMemo(() => {
-    const counts: Record<string, number> = {};
-    for (const era of eras) {
-      counts[era.name] = personMarkers.filter(
-        (p) => p.birth_year >= era.start_year && p.birth_year <= era.end_year
-      ).length;
-    }
-    return counts;
-  }, [eras, personMarkers]);
-
   const personBands = useMemo(() => {
     if (!personMarkers.length) return [];
     return personMarkers.map((p) => ({
@@ -377,11 +367,10 @@ const TimelineSlider: React.FC<TimelineSliderProps> = ({
             const rightPct = yearToPercent(era.end_year);
             const widthPct = rightPct - leftPct;
             if (widthPct <= 0) return null;
-            const isActive = currentEra?.name === era.name;
-            const count = eraPersonCounts[era.name] || 0;
+            const isActive = currentEra?.code === era.code;
             return (
               <button
-                key={era.name}
+                key={era.code}
                 onClick={() => handleEraClick(era)}
                 className="absolute top-0 h-full flex flex-col items-center justify-center overflow-hidden rounded-t transition-all"
                 style={{
@@ -396,7 +385,7 @@ const TimelineSlider: React.FC<TimelineSliderProps> = ({
                   {era.name}
                 </span>
                 <span className="text-[9px] font-mono leading-tight" style={{ color: isActive ? '#fff' : `${era.color}bb` }}>
-                  {count}
+                  {era.count}
                 </span>
               </button>
             );
@@ -62,6 +62,7 @@ const HomePage: React.FC = () => {
       <Header personCount={persons.length} lightMap={lightMap} onGearClick={() => setShowWelcome(true)} />
       <MapView
         persons={persons}
+        eras={eras}
         onPersonClick={handlePersonClick}
         isLoading={loading}
         onStyleChange={setLightMap}
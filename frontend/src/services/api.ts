@@ -1,6 +1,7 @@
 import axios from 'axios';
 import type {
   PersonMap, Person, PersonListResponse, Era, PersonYearRange, Stats, TokenResponse, WelcomeSettings,
+  PersonChanges, SnapshotManifest, PersonBatch, PersonBulkRequest, PersonBulkResult, PersonNearby, Dictionaries,
 } from '../types';
 
 const API_BASE = process.env.REACT_APP_API_URL || '/api';
@@ -30,20 +31,130 @@ api.interceptors.response.use(
 
 // ── Public ──
 
+// Public data is read from the static snapshot when nginx serves one, and
+// from the API otherwise (dev server, snapshot not exported yet, fetch error).
+
+const SNAPSHOT_BASE = '/snapshot';
+
+let manifestRequest: Promise<SnapshotManifest | null> | null = null;
+const snapshotFiles = new Map<string, Promise<unknown>>();
+
+const getSnapshotManifest = () => {
+  if (!manifestRequest) {
+    manifestRequest = axios
+      .get<SnapshotManifest>(`${SNAPSHOT_BASE}/current/manifest.json`)
+      // The dev server answers unknown paths with index.html.
+      .then((r) => (r.data && typeof r.data === 'object' && r.data.shards ? r.data : null))
+      .catch(() => null);
+  }
+  return manifestRequest;
+};
+
+const getSnapshotFile = <T>(manifest: SnapshotManifest, path: string) => {
+  const url = `${SNAPSHOT_BASE}/${manifest.version}/${path}`;
+  if (!snapshotFiles.has(url)) {
+    const request = axios.get<T>(url).then((r) => r.data);
+    request.catch(() => snapshotFiles.delete(url));
+    snapshotFiles.set(url, request);
+  }
+  return snapshotFiles.get(url) as Promise<T>;
+};
+
+const fromSnapshot = async <T>(
+  read: (manifest: SnapshotManifest) => Promise<T>,
+  fallback: () => Promise<T>,
+): Promise<T> => {
+  const manifest = await getSnapshotManifest();
+  if (manifest) {
+    try {
+      return await read(manifest);
+    } catch {
+      // fall through to the API
+    }
+  }
+  return fallback();
+};
+
 export const getPersonsByYear = (year: number) =>
-  api.get<PersonMap[]>('/persons', { params: { year } }).then((r) => r.data);
+  fromSnapshot(
+    async (manifest) => {
+      const bucket = Math.floor(year / manifest.bucket_years) * manifest.bucket_years;
+      const shard = manifest.shards[String(bucket)];
+      if (!shard) return [];
+      const persons = await getSnapshotFile<PersonMap[]>(manifest, shard.path);
+      return persons.filter((p) => p.birth_year <= year && p.death_year >= year);
+    },
+    () => api.get<PersonMap[]>('/persons', { params: { year } }).then((r) => r.data),
+  );
+
+export const getPersonsNearby = (params: {
+  lat: number;
+  lon: number;
+  radius: number;
+  year_from?: number;
+  year_to?: number;
+  limit?: number;
+}) => api.get<PersonNearby[]>('/persons/nearby', { params }).then((r) => r.data);
+
+// Details already fetched this session, so cards opened from the contemporaries
+// list render without another request.
+const personDetails = new Map<string, Person>();
+
+export const getPersonDetail = (id: string) => {
+  const cached = personDetails.get(id);
+  if (cached) return Promise.resolve(cached);
+  return api.get<Person>(`/persons/${id}`).then((r) => {
+    personDetails.set(id, r.data);
+    return r.data;
+  });
+};
+
+const PERSON_BATCH_SIZE = 100;
+
+export const getPersonsBatch = (ids: string[]) =>
+  api.post<PersonBatch>('/persons/batch', { ids }).then((r) => r.data);
 
-export const getPersonDetail = (id: string) =>
-  api.get<Person>(`/persons/${id}`).then((r) => r.data);
+export const prefetchPersonDetails = async (ids: string[]) => {
+  const missing = ids.filter((id) => !personDetails.has(id)).slice(0, PERSON_BATCH_SIZE);
+  if (missing.length === 0) return;
+  const { items } = await getPersonsBatch(missing);
+  items.forEach((person) => personDetails.set(person.id, person));
+};
 
 export const getEras = () =>
-  api.get<Era[]>('/timeline/eras').then((r) => r.data);
+  fromSnapshot(
+    (manifest) => getSnapshotFile<Era[]>(manifest, manifest.files.eras.path),
+    () => api.get<Era[]>('/timeline/eras').then((r) => r.data),
+  );
+
+export const getDictionaries = () =>
+  fromSnapshot(
+    (manifest) => getSnapshotFile<Dictionaries>(manifest, manifest.files.dictionaries.path),
+    () => api.get<Dictionaries>('/dictionaries').then((r) => r.data),
+  );
 
 export const getPersonMarkers = () =>
-  api.get<PersonYearRange[]>('/timeline/person-markers').then((r) => r.data);
+  fromSnapshot(
+    (manifest) => getSnapshotFile<PersonYearRange[]>(manifest, manifest.files.markers.path),
+    () => api.get<PersonYearRange[]>('/timeline/person-markers').then((r) => r.data),
+  );
+
+export const getPersonChanges = (since?: string) =>
+  api.get<PersonChanges>('/persons/changes', { params: since ? { since } : {} }).then((r) => r.data);
 
 export const getWelcomeSettings = () =>
-  api.get<WelcomeSettings>('/settings/welcome').then((r) => r.data);
+  fromSnapshot(
+    (manifest) => getSnapshotFile<WelcomeSettings>(manifest, manifest.files.welcome.path),
+    () => api.get<WelcomeSettings>('/settings/welcome').then((r) => r.data),
+  );
+
+// Resized copy of an upload (/api/img); other URLs are returned unchanged.
+// Sizes are in CSS pixels and doubled for high-density screens.
+export const resizedImageUrl = (url: string, width: number, height: number = width) => {
+  if (!url.startsWith('/uploads/')) return url;
+  const scale = window.devicePixelRatio > 1 ? 2 : 1;
+  return `${API_BASE}/img/${width * scale}x${height * scale}/${url.slice('/uploads/'.length)}`;
+};
 
 // ── Auth ──
 
@@ -65,7 +176,7 @@ export const adminListPersons = (params: {
   page?: number;
   per_page?: number;
   search?: string;
-  era?: string;
+  era_code?: number;
 }) =>
   api.get<PersonListResponse>('/admin/persons', { params }).then((r) => r.data);
 
@@ -81,6 +192,9 @@ export const adminUpdatePerson = (id: string, data: Record<string, unknown>) =>
 export const adminDeletePerson = (id: string) =>
   api.delete(`/admin/persons/${id}`);
 
+export const adminBulkPersons = (data: PersonBulkRequest) =>
+  api.post<PersonBulkResult>('/admin/persons/bulk', data).then((r) => r.data);
+
 // ── Admin Photos ──
 
 export const adminAddPhoto = (personId: string, data: { photo_url: string; caption?: string; display_order?: number }) =>
@@ -89,6 +203,14 @@ export const adminAddPhoto = (personId: string, data: { photo_url: string; capti
 export const adminDeletePhoto = (personId: string, photoId: string) =>
   api.delete(`/admin/persons/${personId}/photos/${photoId}`);
 
+// Replaces the whole gallery in one transaction: items with an id are kept in
+// the given order, items with a photo_url are added, the rest are deleted.
+export const adminSetPhotos = (
+  personId: string,
+  photos: { id?: string; photo_url?: string; caption?: string | null }[],
+) =>
+  api.put<Person>(`/admin/persons/${personId}/photos`, { photos }).then((r) => r.data);
+
 // ── Upload ──
 
 export const uploadImage = async (file: File): Promise<string> => {
@@ -7,8 +7,12 @@ export interface PersonMap {
   birth_lon: number | null;
   main_photo_url: string;
   activity_description: string | null;
-  era: string | null;
-  category: string | null;
+  era_code: number | null;
+  category_code: number | null;
+}
+
+export interface PersonNearby extends PersonMap {
+  distance_km: number;
 }
 
 export interface Photo {
@@ -38,6 +42,10 @@ export interface Person {
   short_bio: string | null;
   era: string | null;
   category: string | null;
+  era_code: number | null;
+  category_code: number | null;
+  // The era was assigned from the life dates rather than chosen.
+  era_auto: boolean;
   is_published: boolean;
   created_at: string;
   updated_at: string;
@@ -53,10 +61,24 @@ export interface PersonListResponse {
 }
 
 export interface Era {
+  code: number;
   name: string;
   start_year: number;
   end_year: number;
   color: string;
+  count: number;
+}
+
+export interface Category {
+  code: number;
+  slug: string;
+  label: string;
+  count: number;
+}
+
+export interface Dictionaries {
+  eras: Era[];
+  categories: Category[];
 }
 
 export interface PersonYearRange {
@@ -64,12 +86,67 @@ export interface PersonYearRange {
   name: string;
   birth_year: number;
   death_year: number;
-  era: string | null;
+  era_code: number | null;
+}
+
+export interface PersonChanges {
+  cursor: string;
+  full_resync: boolean;
+  upserts: PersonMap[];
+  deleted: string[];
+}
+
+export interface PersonBatch {
+  items: Person[];
+  missing: string[];
+}
+
+export interface PersonBulkRequest {
+  operation: 'publish' | 'unpublish' | 'set_era' | 'set_category' | 'delete';
+  ids?: string[];
+  filter?: {
+    era?: string;
+    category?: string;
+    era_code?: number;
+    category_code?: number;
+    search?: string;
+    year_from?: number;
+    year_to?: number;
+    is_published?: boolean;
+  };
+  value?: string | null;
+  dry_run?: boolean;
+}
+
+export interface PersonBulkResult {
+  operation: string;
+  matched: number;
+  affected: number;
+  dry_run: boolean;
+}
+
+export interface SnapshotFile {
+  path: string;
+  bytes: number;
+  sha256: string;
+}
+
+export interface SnapshotManifest {
+  version: string;
+  dataset_version: number;
+  generated_at: string;
+  bucket_years: number;
+  persons_count: number;
+  shards: Record<string, SnapshotFile & { count: number }>;
+  files: Record<'markers' | 'eras' | 'dictionaries' | 'welcome', SnapshotFile>;
 }
 
 export interface EraCount {
   era: string;
   count: number;
+  code: number | null;
+  label: string | null;
+  color: string | null;
 }
 
 export interface Stats {
@@ -0,0 +1,13 @@
+-- Historical Timeline Map — Dataset version for cross-worker cache coherence
+--
+-- Every admin write bumps this counter in the same transaction and sends
+-- NOTIFY timeline_changes; workers compare it with the version their local
+-- caches were built from. Idempotent: safe to apply to an existing database.
+
+CREATE TABLE IF NOT EXISTS dataset_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO dataset_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
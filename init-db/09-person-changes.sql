@@ -0,0 +1,41 @@
+-- Historical Timeline Map — Change tracking for delta sync (/api/persons/changes)
+--
+-- updated_at is stamped by the database clock on every insert/update, and hard
+-- deletes leave a tombstone in person_deletions, so clients can ask for
+-- everything that changed since a cursor. Idempotent: safe to apply to an
+-- existing database.
+
+CREATE INDEX IF NOT EXISTS idx_persons_updated_at ON persons(updated_at);
+
+CREATE TABLE IF NOT EXISTS person_deletions (
+    person_id UUID PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_person_deletions_deleted_at ON person_deletions(deleted_at);
+
+CREATE OR REPLACE FUNCTION persons_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp() AT TIME ZONE 'UTC';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_persons_touch_updated_at ON persons;
+CREATE TRIGGER trg_persons_touch_updated_at
+    BEFORE INSERT OR UPDATE ON persons
+    FOR EACH ROW EXECUTE FUNCTION persons_touch_updated_at();
+
+CREATE OR REPLACE FUNCTION persons_log_deletion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO person_deletions (person_id, deleted_at)
+    VALUES (OLD.id, clock_timestamp() AT TIME ZONE 'UTC')
+    ON CONFLICT (person_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_persons_log_deletion ON persons;
+CREATE TRIGGER trg_persons_log_deletion
+    AFTER DELETE ON persons
+    FOR EACH ROW EXECUTE FUNCTION persons_log_deletion();
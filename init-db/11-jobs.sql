@@ -0,0 +1,33 @@
+-- Historical Timeline Map — Background job queue (services/jobs.py)
+--
+-- Long admin actions are queued here and claimed by worker tasks with
+-- SELECT ... FOR UPDATE SKIP LOCKED, so several backend processes share the
+-- queue without running a job twice. Idempotent: safe to apply to an
+-- existing database.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result JSONB,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    worker VARCHAR(100),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    started_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- The claim query: the oldest due job among the queued ones.
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs(run_after, id) WHERE status = 'queued';
+-- The stale-job reaper.
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at DESC);
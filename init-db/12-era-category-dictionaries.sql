@@ -0,0 +1,146 @@
+-- Historical Timeline Map — Era and category dictionaries
+--
+-- Eras and categories live in small dictionary tables and persons reference
+-- them by SMALLINT code. The text columns persons.era / persons.category stay
+-- as denormalized names for old clients and are kept in sync by a trigger:
+-- whichever of the name or the code a statement writes wins, unknown
+-- categories are added to the dictionary, and a person without a known era is
+-- assigned one from the lifespan (see classify_era). Public map records carry
+-- only the codes; /api/dictionaries sends the names once.
+-- Idempotent: safe to apply to an existing database.
+
+CREATE TABLE IF NOT EXISTS eras (
+    code SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    start_year INTEGER NOT NULL,
+    end_year INTEGER NOT NULL,
+    color VARCHAR(20) NOT NULL DEFAULT '#e94560',
+    CHECK (start_year <= end_year)
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    code SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    slug VARCHAR(100) NOT NULL UNIQUE,
+    label VARCHAR(100) NOT NULL
+);
+
+INSERT INTO eras (name, start_year, end_year, color) VALUES
+    ('Древний Египет', -3000, -30, '#8B4513'),
+    ('Античность', -800, 476, '#CD853F'),
+    ('Средневековье', 476, 1500, '#4A5568'),
+    ('Возрождение', 1300, 1600, '#2D8659'),
+    ('Новое время', 1500, 1900, '#2B6CB0'),
+    ('Новейшее время', 1900, 2026, '#E53E3E')
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO categories (slug, label) VALUES
+    ('ruler', 'Правитель'),
+    ('scientist', 'Учёный'),
+    ('philosopher', 'Философ'),
+    ('artist', 'Деятель искусств'),
+    ('writer', 'Писатель / Поэт'),
+    ('military', 'Военачальник'),
+    ('politician', 'Политик / Оратор'),
+    ('religious', 'Религиозный деятель'),
+    ('engineer', 'Инженер / Архитектор'),
+    ('doctor', 'Врач'),
+    ('explorer', 'Путешественник'),
+    ('athlete', 'Атлет')
+ON CONFLICT (slug) DO NOTHING;
+
+ALTER TABLE persons ADD COLUMN IF NOT EXISTS era_code SMALLINT REFERENCES eras(code);
+ALTER TABLE persons ADD COLUMN IF NOT EXISTS category_code SMALLINT REFERENCES categories(code);
+
+-- The era of a lifespan: the narrowest era containing its midpoint (eras
+-- overlap, e.g. Возрождение inside Средневековье / Новое время), or the
+-- nearest era when none does. The timeline picks the current era the same way.
+CREATE OR REPLACE FUNCTION classify_era(born INTEGER, died INTEGER) RETURNS SMALLINT AS $$
+    SELECT code FROM eras
+    ORDER BY GREATEST(start_year - (born + died) / 2, (born + died) / 2 - end_year, 0),
+             end_year - start_year,
+             code
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION category_code_for(slug_value VARCHAR) RETURNS SMALLINT AS $$
+DECLARE
+    found SMALLINT;
+BEGIN
+    IF slug_value IS NULL OR slug_value = '' THEN
+        RETURN NULL;
+    END IF;
+    SELECT code INTO found FROM categories WHERE slug = slug_value;
+    IF found IS NULL THEN
+        INSERT INTO categories (slug, label) VALUES (slug_value, slug_value)
+        ON CONFLICT (slug) DO NOTHING;
+        SELECT code INTO found FROM categories WHERE slug = slug_value;
+    END IF;
+    RETURN found;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Existing rows: codes from the stored names, the rest classified by lifespan.
+DROP TRIGGER IF EXISTS trg_persons_sync_dictionary_codes ON persons;
+
+UPDATE persons p SET era_code = e.code FROM eras e WHERE p.era_code IS NULL AND e.name = p.era;
+UPDATE persons SET era_code = classify_era(birth_year, death_year) WHERE era_code IS NULL;
+UPDATE persons p SET era = e.name FROM eras e WHERE e.code = p.era_code AND p.era IS DISTINCT FROM e.name;
+UPDATE persons SET category_code = category_code_for(category)
+    WHERE category_code IS NULL AND category IS NOT NULL AND category <> '';
+
+CREATE OR REPLACE FUNCTION persons_sync_dictionary_codes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.era_code IS NULL THEN
+            NEW.era_code := (SELECT code FROM eras WHERE name = NEW.era);
+        END IF;
+        IF NEW.category_code IS NULL THEN
+            NEW.category_code := category_code_for(NEW.category);
+        END IF;
+    ELSE
+        IF NEW.era_code IS NOT DISTINCT FROM OLD.era_code AND NEW.era IS DISTINCT FROM OLD.era THEN
+            NEW.era_code := (SELECT code FROM eras WHERE name = NEW.era);
+        END IF;
+        IF NEW.category_code IS NOT DISTINCT FROM OLD.category_code AND NEW.category IS DISTINCT FROM OLD.category THEN
+            NEW.category_code := category_code_for(NEW.category);
+        END IF;
+    END IF;
+    IF NEW.era_code IS NULL THEN
+        NEW.era_code := classify_era(NEW.birth_year, NEW.death_year);
+    END IF;
+    NEW.era := (SELECT name FROM eras WHERE code = NEW.era_code);
+    NEW.category := (SELECT slug FROM categories WHERE code = NEW.category_code);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_persons_sync_dictionary_codes
+    BEFORE INSERT OR UPDATE ON persons
+    FOR EACH ROW EXECUTE FUNCTION persons_sync_dictionary_codes();
+
+DROP INDEX IF EXISTS idx_persons_era;
+CREATE INDEX IF NOT EXISTS idx_persons_era_code ON persons(era_code);
+CREATE INDEX IF NOT EXISTS idx_persons_category_code ON persons(category_code);
+
+-- Covering indexes for the public map queries: partial indexes over exactly the
+-- rows the public endpoints can return, with every column those endpoints
+-- select in INCLUDE, so /api/persons?year= and /api/timeline/person-markers run
+-- as index-only scans instead of visiting the heap row by row. The year filter
+-- (birth_year <= Y AND death_year >= Y) is selective on death_year for recent
+-- years and on birth_year for ancient ones, so both orders are indexed and the
+-- planner picks per year. Databases that still have the older text-column
+-- versions of these indexes drop them with init-db/14.
+CREATE INDEX IF NOT EXISTS idx_persons_map_codes_by_death ON persons (death_year, birth_year)
+    INCLUDE (id, name, birth_lat, birth_lon, main_photo_url, activity_description, era_code, category_code)
+    WHERE is_published AND birth_lat IS NOT NULL AND birth_lon IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_persons_map_codes_by_birth ON persons (birth_year, death_year)
+    INCLUDE (id, name, birth_lat, birth_lon, main_photo_url, activity_description, era_code, category_code)
+    WHERE is_published AND birth_lat IS NOT NULL AND birth_lon IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_persons_markers_codes ON persons (birth_year)
+    INCLUDE (id, name, death_year, era_code)
+    WHERE is_published;
+
+-- Index-only scans skip the heap only for pages marked all-visible.
+VACUUM (ANALYZE) persons;
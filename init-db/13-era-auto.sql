@@ -0,0 +1,54 @@
+-- Historical Timeline Map — Remember which eras were assigned from the lifespan
+--
+-- persons.era_auto is true when the era was not chosen by an editor but
+-- classified from the life dates (init-db/12, classify_era). Such an era is
+-- reclassified whenever birth_year or death_year change; an era set by name or
+-- code stays as it is. Writing a null era makes it automatic again.
+-- Idempotent: safe to apply to an existing database.
+
+ALTER TABLE persons ADD COLUMN IF NOT EXISTS era_auto BOOLEAN;
+
+-- Existing rows: an era equal to the lifespan classification is taken as automatic.
+-- The backfill changes no content, so updated_at (and incremental clients) are left alone.
+ALTER TABLE persons DISABLE TRIGGER trg_persons_touch_updated_at;
+ALTER TABLE persons DISABLE TRIGGER trg_persons_sync_dictionary_codes;
+UPDATE persons SET era_auto = (era_code IS NOT DISTINCT FROM classify_era(birth_year, death_year))
+    WHERE era_auto IS NULL;
+ALTER TABLE persons ENABLE TRIGGER trg_persons_sync_dictionary_codes;
+ALTER TABLE persons ENABLE TRIGGER trg_persons_touch_updated_at;
+
+ALTER TABLE persons ALTER COLUMN era_auto SET DEFAULT false;
+ALTER TABLE persons ALTER COLUMN era_auto SET NOT NULL;
+
+CREATE OR REPLACE FUNCTION persons_sync_dictionary_codes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.era_code IS NULL THEN
+            NEW.era_code := (SELECT code FROM eras WHERE name = NEW.era);
+        END IF;
+        NEW.era_auto := NEW.era_code IS NULL;
+        IF NEW.category_code IS NULL THEN
+            NEW.category_code := category_code_for(NEW.category);
+        END IF;
+    ELSE
+        IF NEW.era_code IS NOT DISTINCT FROM OLD.era_code AND NEW.era IS DISTINCT FROM OLD.era THEN
+            NEW.era_code := (SELECT code FROM eras WHERE name = NEW.era);
+        END IF;
+        IF NEW.era_code IS DISTINCT FROM OLD.era_code THEN
+            -- A new era from the statement: chosen if known, automatic if null or unknown.
+            NEW.era_auto := NEW.era_code IS NULL;
+        ELSIF NEW.era_auto AND (NEW.birth_year, NEW.death_year) IS DISTINCT FROM (OLD.birth_year, OLD.death_year) THEN
+            NEW.era_code := NULL;
+        END IF;
+        IF NEW.category_code IS NOT DISTINCT FROM OLD.category_code AND NEW.category IS DISTINCT FROM OLD.category THEN
+            NEW.category_code := category_code_for(NEW.category);
+        END IF;
+    END IF;
+    IF NEW.era_code IS NULL THEN
+        NEW.era_code := classify_era(NEW.birth_year, NEW.death_year);
+    END IF;
+    NEW.era := (SELECT name FROM eras WHERE code = NEW.era_code);
+    NEW.category := (SELECT slug FROM categories WHERE code = NEW.category_code);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,11 @@
+-- Historical Timeline Map — Drop the text-column map covering indexes
+--
+-- Databases created before the dictionary codes got covering indexes over the
+-- era/category names (the former init-db/10). Map records now carry the codes
+-- and init-db/12 builds the indexes over those, so the old ones only cost
+-- writes. A fresh database never builds them and this file does nothing.
+-- Idempotent: safe to apply to an existing database.
+
+DROP INDEX IF EXISTS idx_persons_map_by_death;
+DROP INDEX IF EXISTS idx_persons_map_by_birth;
+DROP INDEX IF EXISTS idx_persons_markers;